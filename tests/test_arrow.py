@@ -0,0 +1,56 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from os.path import abspath, dirname
+
+import pyarrow.parquet as pq
+import pytest
+from conftest import test_container, test_dir
+from pyarrow.fs import FileSelector, FileType, PyFileSystem
+
+from v3iofs.arrow import V3ioHandler
+
+here = dirname(abspath(__file__))
+
+
+def test_get_file_info(fs, tree):
+    arrow_fs = PyFileSystem(V3ioHandler(fs))
+    paths = [f"{tree.root}/file1", f"{tree.root}/a", f"{tree.root}/a/file2", f"{tree.root}/nope"]
+    infos = arrow_fs.get_file_info(paths)
+    assert [info.type for info in infos] == [FileType.File, FileType.Directory, FileType.File, FileType.NotFound]
+    assert infos[0].size == len(tree.data["file1"])
+
+
+def test_get_file_info_selector(fs, tree):
+    arrow_fs = PyFileSystem(V3ioHandler(fs))
+    infos = arrow_fs.get_file_info(FileSelector(tree.root))
+    assert sorted(info.base_name for info in infos) == ["a", "b", "file1"]
+
+    infos = arrow_fs.get_file_info(FileSelector(tree.root, recursive=True))
+    start = len(tree.root)
+    files = sorted(info.path[start:] for info in infos if info.type == FileType.File)
+    assert files == ["/a/file1", "/a/file2", "/b/file1", "/file1"]
+
+    assert arrow_fs.get_file_info(FileSelector(f"{tree.root}/nope", allow_not_found=True)) == []
+    with pytest.raises(FileNotFoundError):
+        arrow_fs.get_file_info(FileSelector(f"{tree.root}/nope"))
+
+
+def test_read_parquet(fs):
+    path = f"/{test_container}/{test_dir}/test_arrow.pq"
+    fs.put_file(f"{here}/sanchez.pq", path)
+    try:
+        table = pq.read_table(path, filesystem=PyFileSystem(V3ioHandler(fs)))
+        assert table.equals(pq.read_table(f"{here}/sanchez.pq"))
+    finally:
+        fs.rm(path)
@@ -0,0 +1,80 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from threading import Event, Thread
+from types import SimpleNamespace
+
+import pytest
+
+from v3iofs.balance import _BalancedClient, _max_failures
+
+
+class Node:
+    """Stand-in for the client of one web gateway node"""
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requests = 0
+        self.release = None
+
+    def get_item(self, container, path, **kw):
+        self.requests += 1
+        if self.release is not None:
+            self.release.wait()
+        if self.status_code is None:
+            raise ConnectionError("node down")
+        return SimpleNamespace(status_code=self.status_code)
+
+
+def test_round_robin():
+    nodes = [Node() for _ in range(3)]
+    client = _BalancedClient([(f"node{i}", node) for i, node in enumerate(nodes)])
+    for _ in range(30):
+        client.get_item("bigdata", "a")
+    assert [node.requests for node in nodes] == [10, 10, 10]
+
+
+def test_least_outstanding():
+    busy, idle = Node(), Node()
+    busy.release = Event()
+    client = _BalancedClient([("busy", busy), ("idle", idle)])
+    thread = Thread(target=client.get_item, args=("bigdata", "a"))
+    thread.start()
+    while not busy.requests:
+        pass
+    for _ in range(5):
+        client.get_item("bigdata", "a")
+    busy.release.set()
+    thread.join()
+    assert (busy.requests, idle.requests) == (1, 5)
+
+
+def test_eject_failing():
+    down, up = Node(status_code=None), Node()
+    client = _BalancedClient([("down", down), ("up", up)])
+    failures = 0
+    for _ in range(20):
+        try:
+            client.get_item("bigdata", "a")
+        except ConnectionError:
+            failures += 1
+    assert failures == _max_failures
+    stats = client.stats()
+    assert stats["down"]["ejected"] and not stats["up"]["ejected"]
+
+    up.status_code = 503
+    for _ in range(_max_failures):
+        client.get_item("bigdata", "a")
+    with pytest.raises(ConnectionError):
+        # All ejected, the one that's due back first is used
+        client.get_item("bigdata", "a")
@@ -1,4 +1,5 @@
-from v3iofs.fs import _Cache
+from v3iofs.fs import _Cache, _FooterCache, _SqliteCache
+from v3iofs.memory import _BlockCache, _MemoryBudget
 
 
 def test_put_and_get():
@@ -23,3 +24,115 @@ def test_invalidation_and_gc():
     assert cache.get("k3") is None
     assert cache._cache == {}
     assert cache._expiry_to_key == []
+
+
+def test_sqlite_put_and_get(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = _SqliteCache(path, 10, 100)
+    cache.put("k1", {"name": "v1", "size": 1})
+    cache.put("k2", "v2")
+    cache.put("k2", "v2.1")
+    assert cache.get("k1") == {"name": "v1", "size": 1}
+    assert cache.get("k2") == "v2.1"
+
+    # Another cache on the same file, as in a different process
+    other = _SqliteCache(path, 10, 100)
+    assert other.get("k1") == {"name": "v1", "size": 1}
+    other.delete_if_exists("k1")
+    assert cache.get("k1") is None
+    other.delete_many(["k2", "k3"])
+    assert cache.get("k2") is None
+
+
+def test_sqlite_invalidation_and_capacity(tmp_path):
+    cache = _SqliteCache(str(tmp_path / "cache.db"), 10, 0)
+    cache.put("k1", "v1")
+    assert cache.get("k1") is None
+
+    cache = _SqliteCache(str(tmp_path / "cache2.db"), 3, 100)
+    for i in range(5):
+        cache.put(f"k{i}", i)
+    assert [cache.get(f"k{i}") for i in range(5)] == [None, None, 2, 3, 4]
+
+
+def test_footer_cache(tmp_path):
+    path = str(tmp_path / "footers.db")
+    cache = _FooterCache(2, path)
+    cache.put("/c/f1", 10, 1.5, 4, b"footer")
+    assert cache.get("/c/f1", 10, 1.5) == (4, b"footer")
+    assert cache.get("/c/f1", 11, 1.5) is None, "changed size"
+    assert cache.get("/c/f1", 10, 2.5) is None, "changed mtime"
+
+    cache.put("/c/f2", 10, 1.5, 0, b"f2")
+    cache.put("/c/f3", 10, 1.5, 0, b"f3")
+    assert cache.get("/c/f1", 10, 1.5) is None, "not evicted"
+
+    # Another cache on the same file, as in a different process
+    other = _FooterCache(2, path)
+    assert other.get("/c/f3", 10, 1.5) == (0, b"f3")
+    assert other.get("/c/f1", 10, 1.5) is None
+
+
+def test_memory_budget():
+    budget = _MemoryBudget(10)
+    budget.put(1, 0, b"1234")
+    budget.put(2, 0, b"5678")
+    assert budget.get(1, 0) == b"1234"
+    budget.put(2, 1, b"90ab")
+    assert budget.get(2, 0) is None, "least recently used block not dropped"
+    assert budget.get(1, 0) == b"1234"
+
+    assert not budget.buffered(3, 4)
+    assert budget.get(2, 1) is None, "block not dropped for write buffer"
+    assert budget.buffered(3, 12), "no early flush"
+    assert budget.get(1, 0) is None
+
+    budget.buffered(3, 0)
+    budget.release(3)
+    stats = budget.stats()
+    assert (stats["used"], stats["peak"], stats["early_flushes"]) == (0, 16, 1)
+
+    # The largest buffer is flushed, not a small one that grew
+    budget = _MemoryBudget(1600)
+    assert not budget.buffered(1, 1590)
+    for size in range(10, 60, 10):
+        assert not budget.buffered(2, size), "small buffer flushed"
+    assert budget.buffered(1, 1600), "largest buffer not flushed"
+    budget.buffered(1, 0)
+    assert not budget.buffered(2, 150)
+    assert budget.buffered(2, 1700), "largest buffer not flushed"
+
+
+def test_block_cache():
+    data = bytes(range(100))
+    fetched = []
+
+    def fetcher(start, end):
+        fetched.append((start, end))
+        return data[start:end]
+
+    cache = _BlockCache(40, 10)
+    assert cache.read("/a", 1, 100, 5, 25, fetcher) == data[5:25]
+    assert cache.read("/a", 1, 100, 12, 28, fetcher) == data[12:28]
+    assert fetched == [(0, 30)], "blocks not reused"
+    assert cache.read("/a", 2, 100, 5, 15, fetcher) == data[5:15]
+    assert fetched[-1] == (0, 20), "new mtime, same blocks"
+    assert cache.read("/a", 1, 100, 90, 120, fetcher) == data[90:]
+    assert cache.stats()["evictions"] == 2
+
+    cache.drop("/a")
+    stats = cache.stats()
+    assert (stats["used"], stats["hits"], stats["misses"]) == (0, 2, 6)
+    assert stats["hit_rate"] == 0.25
+
+
+def test_stale(tmp_path):
+    for cache in [_Cache(10, 0, 100), _SqliteCache(str(tmp_path / "cache.db"), 10, 0, 100)]:
+        cache.put("k1", "v1")
+        assert cache.get("k1") is None
+        assert cache.get_stale("k1") == ("v1", True)
+        assert cache.get_stale("k2") == (None, False)
+
+    cache = _Cache(10, 100, 100)
+    cache.put("k1", "v1")
+    assert cache.get_stale("k1") == ("v1", False)
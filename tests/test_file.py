@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pytest
+
 from v3iofs import V3ioFS
 
 
@@ -53,11 +55,125 @@ def test_write_truncate_and_append(fs: V3ioFS, tmp_obj):
     assert data == b"123456"
 
 
-def test_initiate_upload(fs: V3ioFS, tmp_obj):
-    fs.touch(tmp_obj.path)
+def test_write_empty(fs: V3ioFS, tmp_obj):
+    with fs.open(tmp_obj.path, "wb"):
+        pass
+
     assert fs.exists(tmp_obj.path)
-    v3f = fs.open(tmp_obj.path, "wb")
-    v3f._initiate_upload()
-    assert not fs.exists(tmp_obj.path)
-    # should not fail even if the file does not exist
-    v3f._initiate_upload()
+    with fs.open(tmp_obj.path, "rb") as fp:
+        data = fp.read()
+    assert data == b"", "not truncated"
+
+
+def test_write_attributes(fs: V3ioFS, tmp_obj):
+    attributes = {"rows": 10, "schema": "v2"}
+    with fs.open(tmp_obj.path, "wb", attributes=attributes) as v3f:
+        v3f.write(tmp_obj.data)
+
+    info = fs.info(tmp_obj.path, attributes=["rows", "schema", "missing"])
+    assert info["size"] == len(tmp_obj.data)
+    assert (info["rows"], info["schema"]) == (10, "v2")
+    assert "missing" not in info
+
+    parent = tmp_obj.path.rpartition("/")[0]
+    entries = {entry["name"]: entry for entry in fs.ls(parent, attributes=["rows"])}
+    assert entries[tmp_obj.path]["rows"] == 10
+
+    with pytest.raises(ValueError):
+        fs.open(tmp_obj.path, "wb", attributes={"__size": 0})
+
+
+def test_revalidate(fs: V3ioFS, tmp_obj):
+    with fs.open(tmp_obj.path, "rb", cache_type="readahead") as fp:
+        assert fp.read() == tmp_obj.data
+
+        # Same size, only the mtime tells
+        data = tmp_obj.data[::-1]
+        fs.pipe(tmp_obj.path, data)
+        assert fp.revalidate(), "change not detected"
+        fp.seek(0)
+        assert fp.read() == data
+        assert not fp.revalidate()
+
+    fs.pipe(tmp_obj.path, tmp_obj.data)
+    with fs.open(tmp_obj.path, "rb", size=len(tmp_obj.data)) as fp:
+        assert fp.revalidate(), "opened with just a size, always read again"
+        assert fp.read() == tmp_obj.data
+
+
+def test_block_cache(tmp_obj):
+    # Small objects, and objects read through the file cache (without footers, that would serve the whole object)
+    for options in [{}, {"small_object_size": 0, "footer_size": 0}]:
+        fs = V3ioFS(block_cache_size=2**24, skip_instance_cache=True, **options)
+        fs.info(tmp_obj.path)  # Small objects go through the block cache once their info is cached
+        for _ in range(3):
+            with fs.open(tmp_obj.path, "rb", cache_type="none") as fp:
+                assert fp.read() == tmp_obj.data
+        stats = fs.block_cache_stats()
+        assert stats["misses"] > 0, "block cache not used"
+        assert stats["hits"] == 2 * stats["misses"], "file read again"
+
+    data = tmp_obj.data * 2
+    fs.pipe(tmp_obj.path, data)
+    with fs.open(tmp_obj.path, "rb", cache_type="none") as fp:
+        assert fp.read() == data
+
+
+def test_background_upload(fs: V3ioFS, tmp_obj):
+    chunks = [bytes([i]) * 1000 for i in range(10)]
+    with fs.open(tmp_obj.path, "wb", block_size=2500, background_upload=True) as v3f:
+        for chunk in chunks:
+            v3f.write(chunk)
+
+    with fs.open(tmp_obj.path, "rb") as fp:
+        data = fp.read()
+    assert data == b"".join(chunks), "bad data"
+
+    with fs.open(tmp_obj.path, "ab", background_upload=True) as v3f:
+        v3f.write(b"tail")
+
+    with fs.open(tmp_obj.path, "rb") as fp:
+        data = fp.read()
+    assert data == b"".join(chunks) + b"tail", "bad data"
+
+
+codec_modules = {
+    "gzip": "gzip",
+    "zstd": "zstandard",
+    "lz4": "lz4",
+}
+
+
+@pytest.mark.parametrize("codec", list(codec_modules))
+def test_codec(fs: V3ioFS, tmp_obj, codec):
+    pytest.importorskip(codec_modules[codec])
+    data = b"".join(f"line {i}\n".encode() for i in range(10000))
+    with fs.open(tmp_obj.path, "wb", codec=codec, block_size=10000) as v3f:
+        v3f.write(data)
+
+    assert fs.size(tmp_obj.path) < len(data), "not compressed"
+    with fs.open(tmp_obj.path, "rb", codec=codec, block_size=1000) as fp:
+        assert fp.size == len(data)
+        fp.seek(50000)
+        assert fp.read(100) == data[50000:50100], "bad range"
+        fp.seek(0)
+        assert fp.read() == data, "bad data"
+
+
+def test_codec_sizes(fs: V3ioFS, tmp_obj):
+    path = f"{tmp_obj.path}.gz"
+    data = b"".join(f"line {i}\n".encode() for i in range(10000))
+    with fs.open(path, "wb", codec="infer") as v3f:
+        v3f.write(data)
+
+    try:
+        # The file system sees the stored bytes, a file opened with the codec sees the uncompressed data
+        stored = fs.cat_file(path)
+        assert fs.size(path) == len(stored) < len(data)
+        assert fs.cat_file(path, start=10, end=20) == stored[10:20]
+        assert fs.read_block(path, 0, 10) == stored[:10]
+        with fs.open(path, "rb", codec="infer") as fp:
+            assert fp.size == len(data)
+            assert fp.read() == data
+    finally:
+        fs.rm(path)
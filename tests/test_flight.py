@@ -0,0 +1,64 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+
+from v3iofs.flight import _SingleFlight
+
+callers = 8
+
+
+def test_single_flight():
+    release = Event()
+    calls = []
+
+    def request(path):
+        calls.append(path)
+        release.wait()
+        if path == "missing":
+            raise FileNotFoundError(path)
+        return path.upper()
+
+    flights = _SingleFlight()
+    with ThreadPoolExecutor(2 * callers) as pool:
+        infos = [pool.submit(flights.call, "a", request, "a") for _ in range(callers)]
+        missing = [pool.submit(flights.call, "missing", request, "missing") for _ in range(callers)]
+        while flights.shared < 2 * (callers - 1):
+            time.sleep(0.001)
+        release.set()
+        assert [future.result() for future in infos] == ["A"] * callers
+        for future in missing:
+            with pytest.raises(FileNotFoundError):
+                future.result()
+    assert sorted(calls) == ["a", "missing"]
+
+    # Done calls aren't shared
+    assert flights.call("a", request, "a") == "A"
+    assert len(calls) == 3
+
+
+def test_forget():
+    release = Event()
+    flights = _SingleFlight()
+    with ThreadPoolExecutor(1) as pool:
+        running = pool.submit(flights.call, "a", lambda: release.wait() and "old")
+        while not flights._flights:
+            time.sleep(0.001)
+        flights.forget()
+        assert flights.call("a", lambda: "new") == "new"
+        release.set()
+        assert running.result() == "old"
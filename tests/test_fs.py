@@ -12,16 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from datetime import datetime, timezone
+from io import BytesIO
 from os.path import basename, dirname
 from pathlib import Path
+from threading import Event, Thread
 
 import fsspec
 import pytest
 from conftest import test_container, test_dir
+from fsspec.utils import read_block
 
 from v3iofs import V3ioFS
 from v3iofs.fs import parse_time
 from v3iofs.path import split_container
+from v3iofs.trace import read_trace
 
 path_types = [
     str,
@@ -59,6 +63,20 @@ def test_ls_with_marker(fs: V3ioFS, new_file):
     assert len(out) == 5, "not all files returned"
 
 
+def test_ls_cache():
+    fs = V3ioFS(cache_listings=True, skip_instance_cache=True)
+    root = f"/{test_container}"
+    path = f"{root}/{datetime.now().strftime('test_ls_cache_%f')}"
+    try:
+        fs.ls(root, detail=False)
+        fs.pipe(path, b"data")
+        assert path in fs.ls(root, detail=False), "cached listing not invalidated"
+        assert path in fs.ls(f"{root}/", detail=False), "cached listing not invalidated"
+    finally:
+        fs.rm(path)
+    assert path not in fs.ls(root, detail=False), "cached listing not invalidated"
+
+
 def test_rm(fs: V3ioFS, tmp_obj):
     path = tmp_obj.path
     fs.rm(path)
@@ -158,3 +176,346 @@ def test_directory_with_file():
     finally:
         fs.rm(file_path)
         fs.rmdir(dir_path)
+
+
+def test_cat_file(fs: V3ioFS, tmp_obj):
+    assert fs.cat_file(tmp_obj.path) == tmp_obj.data
+    assert fs.cat_file(tmp_obj.path, start=3, end=8) == tmp_obj.data[3:8]
+    with pytest.raises(FileNotFoundError):
+        fs.cat_file(f"{tmp_obj.path}-missing")
+
+
+def test_open_small_object(tmp_obj, tmp_path):
+    trace_path = str(tmp_path / "trace.jsonl")
+    fs = V3ioFS(cache_validity_seconds=0, trace_path=trace_path, skip_instance_cache=True)
+    with fs.open(tmp_obj.path, "rb") as fp:
+        assert fp._data == tmp_obj.data, "not read in a single request"
+        assert fp.size == len(tmp_obj.data)
+        assert fp.read() == tmp_obj.data
+    fs._client.close()
+    assert [record["op"] for record in read_trace(trace_path)] == ["get_object"], "more than one request"
+
+    # Larger objects keep the bytes read while opening them
+    fs = V3ioFS(cache_validity_seconds=0, small_object_size=4)
+    with fs.open(tmp_obj.path, "rb") as fp:
+        assert fp._data is None
+        assert fp._head == tmp_obj.data[:4]
+        assert fp.read() == tmp_obj.data
+
+    fs = V3ioFS(cache_validity_seconds=0, small_object_size=0)
+    with fs.open(tmp_obj.path, "rb") as fp:
+        assert fp._data is None
+        assert fp.read() == tmp_obj.data
+
+
+def test_appender(fs: V3ioFS):
+    root = f"/{test_container}/{test_dir}/test_appender"
+
+    def write(appender, writer):
+        for i in range(100):
+            appender.write(f"{root}/{writer % 2}.log", f"{writer}:{i}\n".encode())
+
+    try:
+        with fs.appender(flush_size=1024) as appender:
+            threads = [Thread(target=write, args=(appender, writer)) for writer in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            ack = appender.write(f"{root}/last.log", b"last")
+            appender.flush()
+            assert ack.done()
+
+        for name in ["0.log", "1.log"]:
+            lines = fs.cat_file(f"{root}/{name}").decode().split()
+            assert len(lines) == 200
+            for writer in {line.split(":")[0] for line in lines}:
+                assert [line for line in lines if line.startswith(f"{writer}:")] == [
+                    f"{writer}:{i}" for i in range(100)
+                ], "writer order not kept"
+        assert fs.cat_file(f"{root}/last.log") == b"last"
+    finally:
+        fs.rm(root, recursive=True)
+
+
+def test_build_index(fs: V3ioFS, tree):
+    extra = f"{tree.root}/a/extra"
+    fs.pipe(extra, b"deleted through the index")
+    index = fs.build_index(tree.root)
+    try:
+        indexed = V3ioFS(indexes=[tree.root], skip_instance_cache=True)
+        assert indexed.find(tree.root) == fs.find(tree.root)
+        assert indexed.glob(f"{tree.root}/*/file1") == fs.glob(f"{tree.root}/*/file1")
+        assert indexed.ls(f"{tree.root}/a", detail=False) == fs.ls(f"{tree.root}/a", detail=False)
+        assert indexed.info(f"{tree.root}/a/file2")["size"] == len(tree.data["a"]["file2"])
+        assert indexed._indexes[tree.root], "index not used"
+        with pytest.raises(FileNotFoundError):
+            indexed.info(f"{tree.root}/nope")
+
+        # Deleting through the file system stops using the index
+        assert indexed.exists(extra)
+        indexed.rm(extra)
+        assert extra not in indexed.find(tree.root)
+        assert not indexed.exists(extra)
+    finally:
+        fs.rm(index)
+        # extra was deleted behind the back of fs
+        fs.invalidate_cache()
+        if fs.exists(extra):
+            fs.rm(extra)
+
+
+def test_index_load_concurrent(fs: V3ioFS, tree):
+    index = fs.build_index(tree.root)
+    try:
+        indexed = V3ioFS(indexes=[tree.root], skip_instance_cache=True)
+        # The first load stalls while listing the parent directory
+        dir_mtime, stalled, release = indexed._dir_mtime, Event(), Event()
+
+        def slow_dir_mtime(path):
+            if not stalled.is_set():
+                stalled.set()
+                release.wait(10)
+            return dir_mtime(path)
+
+        indexed._dir_mtime = slow_dir_mtime
+        slow = Thread(target=indexed.find, args=(tree.root,))
+        slow.start()
+        stalled.wait(10)
+        fast = Thread(target=indexed.ls, args=(f"{tree.root}/a",))
+        fast.start()
+        fast.join(5)
+        done = not fast.is_alive()
+        release.set()
+        slow.join()
+        fast.join()
+        assert done, "waited for another index load"
+    finally:
+        fs.rm(index)
+
+
+def test_read_block(fs: V3ioFS):
+    path = f"/{test_container}/{test_dir}/test_read_block.csv"
+    data = b"".join(b"%d,%s\n" % (i, b"x" * (i % 7)) for i in range(1000)) + b"last"
+    fs.pipe(path, data)
+    try:
+        for delimiter in [None, b"\n", b"xx\n"]:
+            for offset, length in [(0, 100), (50, 100), (1000, 10**6), (len(data) - 2, 10)]:
+                expected = read_block(BytesIO(data), offset, min(length, len(data) - offset), delimiter)
+                assert fs.read_block(path, offset, length, delimiter) == expected
+    finally:
+        fs.rm(path)
+
+
+def test_read_footers():
+    fs = V3ioFS(footer_size=2**16, skip_instance_cache=True)
+    path = f"/{test_container}/{test_dir}/test_read_footers"
+    data = bytes(range(256)) * 1024
+    fs.pipe(path, data)
+    try:
+        footers = fs.read_footers([path])
+        footer_size = fs._footer_size
+        assert footers[path] == data[-footer_size:]
+
+        info = fs.info(path)
+        assert fs._footers.get(path, info["size"], info["mtime"]) is not None, "footer not kept"
+        with fs.open(path, "rb") as fp:
+            fp.seek(-100, 2)
+            assert fp.read() == data[-100:]
+    finally:
+        fs.rm(path)
+
+
+def test_auto_block_size(fs: V3ioFS):
+    path = f"/{test_container}/{test_dir}/test_auto_block_size"
+    bounds = (2**16, 2**22)
+    tuned = V3ioFS(auto_block_size=bounds, small_object_size=0, skip_instance_cache=True)
+    assert fs.transfer_stats() is None
+    data = bytes(range(256)) * 2**14
+    try:
+        with tuned.open(path, "wb", block_size=2**20) as out:
+            out.write(data)
+        with tuned.open(path, "rb", block_size=2**18) as fp:
+            assert fp.read() == data
+        with tuned.open(path, "rb", block_size=2**18, cache_type="bytes") as fp:
+            for offset in [2**21, 2**19, 3 * 2**20, 0]:
+                end = offset + 100
+                fp.seek(offset)
+                assert fp.read(100) == data[offset:end]
+
+        stats = tuned.transfer_stats()
+        for direction in ["read", "write"]:
+            assert stats[direction]["bandwidth"] > 0
+            assert bounds[0] <= stats[direction]["block_size"] <= bounds[1]
+        with tuned.open(path, "rb") as fp:
+            assert bounds[0] <= fp.blocksize <= stats["read"]["block_size"], "random reads, smaller blocks"
+    finally:
+        fs.rm(path)
+
+
+def test_prefetch(fs: V3ioFS):
+    root = f"/{test_container}/{test_dir}/test_prefetch"
+    data = bytes(range(256)) * 2**12
+    paths = [f"{root}/{i}" for i in range(3)]
+    for path in paths:
+        fs.pipe(path, data)
+    try:
+        with pytest.raises(ValueError):
+            fs.prefetch(paths, data=True)
+
+        # Without footers, the ends of the files are read from the block cache
+        cached = V3ioFS(block_cache_size=2**24, footer_size=0, skip_instance_cache=True)
+        errors = cached.prefetch(paths + [f"{root}/missing"], ranges=[(-1000, None)]).wait(timeout=30)
+        assert list(errors) == [f"{root}/missing"]
+        assert isinstance(errors[f"{root}/missing"], FileNotFoundError)
+
+        stats = cached.block_cache_stats()
+        for path in paths:
+            assert cached.cat_file(path, start=-1000) == data[-1000:]
+        assert cached.block_cache_stats()["misses"] == stats["misses"], "not prefetched"
+        assert cached.block_cache_stats()["hits"] > stats["hits"]
+    finally:
+        fs.rm(root, recursive=True)
+
+
+def test_rm_recursive(fs: V3ioFS):
+    class Progress:
+        count = 0
+
+        def relative_update(self, inc=1):
+            self.count += inc
+
+    root = f"/{test_container}/{test_dir}/test_rm_recursive"
+    files = [f"{root}/file", f"{root}/a/file1", f"{root}/a/file2", f"{root}/a/b/file"]
+    for path in files:
+        with fs.open(path, "wb") as out:
+            out.write(b"delete me")
+
+    progress = Progress()
+    fs.rm(root, recursive=True, callback=progress)
+    assert not fs.exists(root), "not deleted"
+    assert progress.count == len(files) + 3, "bad progress"  # files + root, a, a/b
+
+
+def test_rm_glob(fs: V3ioFS):
+    root = f"/{test_container}/{test_dir}/test_rm_glob"
+    for name in ["a.csv", "b.csv", "c.txt", "d.csv/e.csv"]:
+        fs.pipe(f"{root}/{name}", b"delete me")
+    try:
+        fs.rm(f"{root}/*.csv", recursive=True)
+        assert [basename(path) for path in fs.ls(root, detail=False)] == ["c.txt"]
+        with pytest.raises(FileNotFoundError):
+            fs.rm(f"{root}/*.csv")
+    finally:
+        fs.rm(root, recursive=True)
+
+
+def test_rm_missing(fs: V3ioFS):
+    path = f"/{test_container}/{test_dir}/test_rm_missing"
+    with pytest.raises(FileNotFoundError):
+        fs.rm(path, recursive=True)
+    fs.rm(path)  # Like fsspec, only recursive deletes check that the path exists
+
+
+def test_put_and_get_file(fs: V3ioFS, tmp_path):
+    data = bytes(range(256)) * 1000
+    src, dest = tmp_path / "src", tmp_path / "dest"
+    src.write_bytes(data)
+    path = f"/{test_container}/{test_dir}/test_put_and_get_file"
+    try:
+        fs.put_file(str(src), path, chunk_size=10000)
+        assert fs.cat_file(path) == data, "bad upload"
+
+        fs.get_file(path, str(dest), chunk_size=10000)
+        assert dest.read_bytes() == data, "bad download"
+    finally:
+        fs.rm(path)
+
+
+def test_sync(fs: V3ioFS, tmp_path):
+    src, dest = tmp_path / "src", tmp_path / "dest"
+    (src / "sub").mkdir(parents=True)
+    (src / "file1").write_bytes(b"file 1 data")
+    (src / "sub" / "file2").write_bytes(b"file 2 data")
+    url = f"v3io:///{test_container}/{test_dir}/test_sync"
+    try:
+        out = fs.sync(str(src), url)
+        assert len(out["copy"]) == 2, "not uploaded"
+        out = fs.sync(str(src), url)
+        assert out == {"copy": [], "delete": []}, "unchanged files copied"
+
+        (src / "file1").write_bytes(b"file 1 new data")
+        out = fs.sync(str(src), url, dry_run=True)
+        assert out["copy"] == [f"/{test_container}/{test_dir}/test_sync/file1"]
+        fs.sync(str(src), url)
+
+        out = fs.sync(url, str(dest))
+        assert len(out["copy"]) == 2, "not downloaded"
+        assert (dest / "file1").read_bytes() == b"file 1 new data"
+        assert (dest / "sub" / "file2").read_bytes() == b"file 2 data"
+    finally:
+        fs.rm(f"/{test_container}/{test_dir}/test_sync", recursive=True)
+
+
+def test_ls_file(fs: V3ioFS, tmp_obj):
+    out = fs.ls(tmp_obj.path)
+    assert len(out) == 1
+    assert out[0]["name"] == tmp_obj.path
+    assert out[0]["type"] == "file"
+    assert out[0]["size"] == len(tmp_obj.data)
+
+    assert fs.ls(tmp_obj.path, detail=False) == [tmp_obj.path]
+    with pytest.raises(FileNotFoundError):
+        fs.ls(f"{tmp_obj.path}-missing")
+
+
+def test_transaction(fs: V3ioFS, tmp_path):
+    root = f"/{test_container}/{test_dir}/test_transaction"
+    paths = [f"{root}/part-{i}" for i in range(3)]
+    local = tmp_path / "local"
+    local.write_bytes(b"put")
+    try:
+        with fs.transaction:
+            for i, path in enumerate(paths):
+                with fs.open(path, "wb") as out:
+                    out.write(f"part {i}".encode())
+            fs.put_file(str(local), f"{root}/put")
+            assert not any(fs.exists(path) for path in paths + [f"{root}/put"]), "visible before commit"
+
+        for i, path in enumerate(paths):
+            assert fs.cat_file(path) == f"part {i}".encode()
+        assert fs.cat_file(f"{root}/put") == b"put"
+
+        with pytest.raises(RuntimeError):
+            with fs.transaction:
+                with fs.open(f"{root}/aborted", "wb") as out:
+                    out.write(b"aborted")
+                fs.put_file(str(local), f"{root}/aborted-put")
+                raise RuntimeError("abort")
+        assert not fs.exists(f"{root}/aborted"), "aborted file committed"
+        assert not fs.exists(f"{root}/aborted-put"), "aborted put committed"
+    finally:
+        fs.rm(root, recursive=True)
+
+
+@pytest.mark.parametrize("codec", [None, "gzip"])
+def test_transaction_single_put(tmp_path, codec):
+    trace_path = str(tmp_path / "trace.jsonl")
+    fs = V3ioFS(trace_path=trace_path, skip_instance_cache=True)
+    path = f"/{test_container}/{test_dir}/test_transaction_single_put"
+    data = bytes(range(256)) * 1000
+    with fs.transaction:
+        with fs.open(path, "wb", block_size=100_000, codec=codec) as out:
+            out.write(data)
+    fs._client.close()
+
+    fs = V3ioFS(skip_instance_cache=True)
+    try:
+        puts = [record for record in read_trace(trace_path) if record["op"] == "put_object"]
+        assert len(puts) == 1, "commit not sent in a single put"
+        with fs.open(path, "rb", block_size=100_000, codec=codec) as fp:
+            assert fp.read() == data
+            fp.seek(150_000)
+            assert fp.read(10) == data[150_000:150_010]
+    finally:
+        fs.rm(path)
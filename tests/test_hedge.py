@@ -0,0 +1,86 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from v3iofs.hedge import _Hedger, _max_tokens, _max_workers
+
+
+def test_hedge_stalled_request():
+    stalled = []
+
+    def request(value):
+        # The first "stalled" request stalls, its duplicate doesn't
+        if value == "stalled" and not stalled:
+            stalled.append(value)
+            time.sleep(2)
+        else:
+            time.sleep(0.001)
+        return value
+
+    hedger = _Hedger(90, 1)
+    for i in range(30):
+        assert hedger.call("get_object", request, i) == i
+
+    hedged = hedger.hedged
+    start = time.monotonic()
+    assert hedger.call("get_object", request, "stalled") == "stalled"
+    assert time.monotonic() - start < 1, "not hedged"
+    assert hedger.hedged == hedged + 1
+
+
+def test_hedge_budget():
+    hedger = _Hedger(50, 0.01)
+    for _ in range(100):
+        hedger.call("get_item", time.sleep, 0.001)
+    # 1 initial token and 0.01 per request
+    assert hedger.hedged <= 2
+
+
+def test_hedge_many_callers():
+    def request(seconds):
+        time.sleep(seconds)
+        return seconds
+
+    hedger = _Hedger(90, 1)
+    for _ in range(30):
+        hedger.call("get_object", request, 0.05)
+
+    # Many more callers than hedge workers, none of them slow
+    callers = 4 * _max_workers
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(hedger.call, "get_object", request, 0.02) for _ in range(callers)]
+        assert [future.result() for future in futures] == [0.02] * callers
+    assert hedger.hedged == 0, "requests waiting for a worker were hedged"
+
+
+def test_hedge_bounded_threads():
+    def request(seconds):
+        time.sleep(seconds)
+        return seconds
+
+    hedger = _Hedger(50, 1)
+    for _ in range(30):
+        hedger.call("get_object", request, 0.05)
+
+    # All slow, more callers than workers, all arriving before any can be hedged
+    callers = 4 * _max_workers
+    baseline = threading.active_count()
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(hedger.call, "get_object", request, 0.5) for _ in range(callers)]
+        time.sleep(0.3)
+        threads = threading.active_count()
+        assert [future.result() for future in futures] == [0.5] * callers
+    assert threads <= baseline + callers + _max_workers + _max_tokens, "unbounded threads"
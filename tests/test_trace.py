@@ -0,0 +1,44 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from v3iofs import V3ioFS
+from v3iofs.trace import read_trace, replay, summarize
+
+
+def test_trace_and_replay(tmp_obj, tmp_path):
+    trace_path = str(tmp_path / "trace.jsonl")
+    fs = V3ioFS(trace_path=trace_path, skip_instance_cache=True)
+    fs.info(tmp_obj.path)
+    assert fs.cat_file(tmp_obj.path) == tmp_obj.data
+    fs._client.close()
+
+    records = read_trace(trace_path)
+    assert [record["op"] for record in records] == ["get_item", "get_object"]
+    assert all(record["status"] == 200 for record in records)
+    assert records[1]["length"] == len(tmp_obj.data)
+
+    results = replay(V3ioFS(skip_instance_cache=True), records, speed=0)
+    summary = summarize(results)
+    assert summary["get_item"]["count"] == 1
+    assert summary["get_object"]["errors"] == 0
+
+
+def test_trace_attributes(tmp_obj, tmp_path):
+    trace_path = str(tmp_path / "trace.jsonl")
+    fs = V3ioFS(trace_path=trace_path, skip_instance_cache=True)
+    with fs.open(tmp_obj.path, "wb", attributes={"crc": b"\x01", "rows": 3}) as out:
+        out.write(tmp_obj.data)
+    fs._client.close()
+
+    updates = [record for record in read_trace(trace_path) if record["op"] == "update_item"]
+    assert [record["kw"]["attributes"] for record in updates] == [["crc", "rows"]]
@@ -0,0 +1,39 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from v3iofs.tuning import _Tuner
+
+mib = 2**20
+
+
+def test_block_size():
+    tuner = _Tuner(mib // 4, 64 * mib)
+    assert tuner.block_size("/a/b", "rb") == 5 * mib, "no measurements"
+
+    # 20ms latency, 100MiB/s: a bandwidth-delay product of 2MiB
+    for _ in range(10):
+        tuner.record("read", 0, 0.02)
+        tuner.record("read", 8 * mib, 0.02 + 0.08)
+    assert tuner.block_size("/a/b", "rb") == 8 * mib
+    tuner.record_pattern("/a/b", random=True)
+    assert tuner.block_size("/a/b", "rb") == mib // 2
+    assert tuner.block_size("/a/c", "rb") == 8 * mib
+
+    # The latency is shared with reads, 1600MiB/s makes a bandwidth-delay product of 32MiB
+    tuner.record("write", 8 * mib, 0.02 + 0.005)
+    assert tuner.block_size("/a/b", "wb") == 64 * mib, "bounded"
+
+    stats = tuner.stats()
+    assert stats["read"]["latency"] == 0.02
+    assert round(stats["read"]["bandwidth"] / mib) == 100
+    assert stats["read"]["block_size"] == 8 * mib
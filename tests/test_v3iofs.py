@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import subprocess
+import sys
 
 import fsspec
 
@@ -23,3 +25,20 @@ def test_register():
 
     fs = fsspec.filesystem("v3io")
     assert isinstance(fs, V3ioFS), f"bad object class - {fs.__class__}"
+
+
+def test_lazy_import():
+    # Importing v3iofs and resolving the protocol must not load the v3io client
+    code = "; ".join(
+        [
+            "import sys, time",
+            "start = time.perf_counter()",
+            "import v3iofs, fsspec",
+            "fsspec.get_filesystem_class('v3io')",
+            "print(time.perf_counter() - start)",
+            "assert 'v3io' not in sys.modules, 'v3io imported'",
+        ]
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert float(out.stdout) < 1, "slow import"
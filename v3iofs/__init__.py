@@ -21,22 +21,26 @@ __all__ = [
 
 __version__ = "0.0.0+unstable"
 
-import fsspec
+from fsspec.registry import known_implementations
 
-from .file import V3ioFile  # noqa: F401
-from .fs import V3ioFS  # noqa: F401
+# Registered by name, so that importing v3iofs is cheap. V3ioFS is imported when the protocol is first used, and
+# the v3io client when a V3ioFS is created.
+known_implementations["v3io"] = {
+    "class": "v3iofs.V3ioFS",
+    "err": "Please install v3iofs to use the v3io fileysstem class",
+}
 
-if hasattr(fsspec, "register_implementation"):
-    # TODO: Not sure about clobber=True
-    fsspec.register_implementation("v3io", V3ioFS, clobber=True)
-else:
-    from fsspec.registry import known_implementations
+del known_implementations  # clear the module namespace
 
-    known_implementations["v3io"] = {
-        "class": "v3iofs.V3ioFS",
-        "err": "Please install v3iofs to use the v3io fileysstem class",
-    }
 
-    del known_implementations
+def __getattr__(name):
+    # Imported on first access, see the registration above
+    if name == "V3ioFS":
+        from .fs import V3ioFS
 
-del fsspec  # clear the module namespace
+        return V3ioFS
+    if name == "V3ioFile":
+        from .file import V3ioFile
+
+        return V3ioFile
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
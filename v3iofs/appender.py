@@ -0,0 +1,180 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Thread
+
+from .path import split_container, unslash
+from .utils import RaiseForStatus, handle_v3io_errors
+
+
+class _Buffer:
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        # Acks of the buffered chunks, and of the batch being sent
+        self.acks = []
+        self.in_flight = []
+        self.since = None
+        self.flush_requested = False
+
+
+class Appender:
+    """Appends to objects from many threads, batching the writes to each object into a single request
+
+    Writes are buffered per path and sent as one append once flush_size bytes are buffered, the oldest buffered
+    write is flush_interval seconds old, or on flush(). Batches of the same path are sent one at a time, so
+    writes reach the object in the order of the write() calls. Batches of different paths are sent
+    concurrently.
+
+    Create with V3ioFS.appender().
+
+    Parameters
+    ----------
+    fs: V3ioFS
+        File system to append through
+    flush_size: int
+        Send the buffer of a path once it has this many bytes
+    flush_interval: float
+        Send the buffer of a path once its oldest write is this many seconds old
+    max_workers: int
+        Number of concurrent appends
+    """
+
+    def __init__(self, fs, flush_size, flush_interval, max_workers):
+        self._fs = fs
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._pool = ThreadPoolExecutor(max_workers)
+        self._lock = Condition()
+        self._buffers = {}
+        self._closed = False
+        self._timer = Thread(target=self._run_timer, name="v3iofs-appender", daemon=True)
+        self._timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, path, data):
+        """Append data to path
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Done once data was appended, with the exception if the append failed
+        """
+        path = "/" + unslash(self._fs._strip_protocol(path))
+        ack = Future()
+        with self._lock:
+            if self._closed:
+                raise ValueError("appender is closed")
+            buf = self._buffers.get(path)
+            if buf is None:
+                buf = self._buffers[path] = _Buffer()
+            buf.chunks.append(bytes(data))
+            buf.size += len(data)
+            buf.acks.append(ack)
+            if buf.since is None:
+                buf.since = time.monotonic()
+            if buf.size >= self._flush_size:
+                self._send(path, buf)
+        return ack
+
+    def flush(self, path=None):
+        """Send the buffered writes (of path, or of all paths) and wait until they're appended
+
+        Raises the error of the first failed append.
+        """
+        with self._lock:
+            if path is None:
+                paths = list(self._buffers)
+            else:
+                paths = ["/" + unslash(self._fs._strip_protocol(path))]
+            acks = []
+            for path in paths:
+                buf = self._buffers.get(path)
+                if buf is None:
+                    continue
+                acks.extend(buf.in_flight)
+                acks.extend(buf.acks)
+                buf.flush_requested = True
+                self._send(path, buf)
+
+        for ack in acks:
+            ack.result()
+
+    def close(self):
+        """Flush all buffered writes and stop"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._lock.notify_all()
+        self._timer.join()
+        try:
+            self.flush()
+        finally:
+            self._pool.shutdown()
+
+    def _send(self, path, buf):
+        """Start sending the buffer of path, under _lock. A batch that's already in flight is left to finish
+        first, its completion sends the rest."""
+        if buf.in_flight or not buf.chunks:
+            return
+        body = b"".join(buf.chunks)
+        buf.in_flight, buf.acks = buf.acks, []
+        buf.chunks, buf.size, buf.since, buf.flush_requested = [], 0, None, False
+        self._pool.submit(self._append, path, body, buf.in_flight)
+
+    def _append(self, path, body, acks):
+        container, path_without_container = split_container(path)
+        try:
+            resp = self._fs._client.put_object(
+                container,
+                path_without_container,
+                body=body,
+                append=True,
+                raise_for_status=RaiseForStatus.never,
+            )
+            handle_v3io_errors(resp, path)
+            self._fs.invalidate_cache(path)
+        except Exception as err:
+            for ack in acks:
+                ack.set_exception(err)
+        else:
+            for ack in acks:
+                ack.set_result(None)
+        finally:
+            with self._lock:
+                buf = self._buffers[path]
+                buf.in_flight = []
+                if buf.size >= self._flush_size or buf.flush_requested or self._due(buf, time.monotonic()):
+                    self._send(path, buf)
+                elif not buf.chunks:
+                    del self._buffers[path]
+
+    def _due(self, buf, now):
+        return buf.since is not None and now - buf.since >= self._flush_interval
+
+    def _run_timer(self):
+        with self._lock:
+            while not self._closed:
+                self._lock.wait(self._flush_interval / 2)
+                now = time.monotonic()
+                for path, buf in list(self._buffers.items()):
+                    if self._due(buf, now):
+                        self._send(path, buf)
@@ -0,0 +1,138 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""pyarrow file system handler for V3ioFS
+
+>>> from pyarrow.fs import PyFileSystem
+>>> from v3iofs.arrow import V3ioHandler
+>>> arrow_fs = PyFileSystem(V3ioHandler(fs))  # doctest: +SKIP
+>>> dataset = pyarrow.dataset.dataset("/bigdata/path/to/dataset", filesystem=arrow_fs)  # doctest: +SKIP
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from pyarrow import PythonFile
+    from pyarrow.fs import FileInfo, FileType, FSSpecHandler
+except ImportError:
+    raise ImportError("v3iofs.arrow requires the pyarrow package")
+
+from .fs import V3ioFS, _max_workers
+from .path import split_container, unslash
+
+
+class V3ioHandler(FSSpecHandler):
+    """pyarrow FileSystemHandler for V3ioFS
+
+    Unlike the generic ``FSSpecHandler``, file info is fetched with one listing per directory instead of one
+    request per path, selectors are listed recursively with concurrent listings, and input files read the
+    requested ranges directly, without a read-ahead cache.
+
+    Parameters
+    ----------
+    fs: V3ioFS
+        File system to wrap
+    max_workers: int | None
+        Number of concurrent listings. Default is 8.
+    """
+
+    def __init__(self, fs, max_workers=None):
+        super().__init__(fs)
+        self._max_workers = max_workers or _max_workers
+
+    def get_type_name(self):
+        return "v3io"
+
+    def get_file_info(self, paths):
+        normalized = [_normalize(path) for path in paths]
+        parents = sorted({parent for parent, _ in map(_split_parent, normalized)})
+        with ThreadPoolExecutor(self._max_workers) as pool:
+            listed = dict(zip(parents, pool.map(self._list_parent, parents)))
+
+        infos = []
+        for path, norm in zip(paths, normalized):
+            entry = listed[_split_parent(norm)[0]].get(norm)
+            if entry is None:
+                infos.append(FileInfo(path, FileType.NotFound))
+            else:
+                infos.append(self._create_file_info(path, entry))
+        return infos
+
+    def _list_parent(self, parent):
+        """Map path -> info of the entries of directory parent, empty if it's not a directory"""
+        if parent == "/":
+            # Containers, which ls doesn't describe as directories
+            return {path: {"type": "directory", "size": None} for path in self.fs.ls("/", detail=False)}
+        try:
+            entries = self.fs.ls(parent, detail=True)
+        except FileNotFoundError:
+            return {}
+        return {entry["name"]: entry for entry in entries if entry["name"] != parent}
+
+    def get_file_info_selector(self, selector):
+        base_dir = _normalize(selector.base_dir)
+        try:
+            entries = self.fs.ls(base_dir, detail=True)
+        except FileNotFoundError:
+            # Empty directories don't list
+            try:
+                self.fs.info(base_dir)
+            except FileNotFoundError:
+                if selector.allow_not_found:
+                    return []
+                raise
+            return []
+        if len(entries) == 1 and entries[0]["name"] == base_dir and entries[0]["type"] == "file":
+            raise NotADirectoryError(selector.base_dir)
+
+        if selector.recursive:
+            entries = list(self.fs._walk_tree(base_dir, self._max_workers))
+        return [self._create_file_info(entry["name"], entry) for entry in entries if entry["name"] != base_dir]
+
+    def open_input_stream(self, path):
+        return self._open_input(path, cache_type="readahead")
+
+    def open_input_file(self, path):
+        return self._open_input(path, cache_type="none")
+
+    def _open_input(self, path, cache_type):
+        path = _normalize(path)
+        info = self.fs.info(path)
+        if info["type"] != "file":
+            raise FileNotFoundError(path)
+        # With a known size and no cache, every read is a single ranged GET
+        f = self.fs.open(path, mode="rb", cache_type=cache_type, info=info)
+        return PythonFile(f, mode="r")
+
+
+def _normalize(path):
+    """
+    >>> _normalize("v3io://bigdata/a/b/")
+    '/bigdata/a/b'
+    >>> _normalize("bigdata/a")
+    '/bigdata/a'
+    """
+    return "/" + unslash(V3ioFS._strip_protocol(path))
+
+
+def _split_parent(path):
+    """
+    >>> _split_parent("/bigdata/a/b")
+    ('/bigdata/a', 'b')
+    >>> _split_parent("/bigdata")
+    ('/', 'bigdata')
+    """
+    container, rest = split_container(path)
+    if not rest:
+        return "/", container
+    parent, _, name = path.rpartition("/")
+    return parent, name
@@ -0,0 +1,110 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Requests spread over several web gateway nodes"""
+import time
+from threading import Lock
+
+# Consecutive failures that eject a node, and for how long
+_max_failures = 3
+_eject_seconds = 10
+
+
+class _Node:
+    def __init__(self, endpoint, client):
+        self.endpoint = endpoint
+        self.client = client
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0
+        self.requests = 0
+
+
+class _BalancedClient:
+    """Wraps one v3io client per endpoint, sending each request to the node with the fewest outstanding requests
+
+    Ties go round robin. A node whose last _max_failures requests failed (raised or got a 5xx response) is
+    ejected for _eject_seconds, and ejected again on its next failure once it's back. When all the nodes are
+    ejected, the one that's due back first is used. Failed requests aren't retried on another node, appends
+    can't be sent twice.
+    """
+
+    def __init__(self, clients):
+        """clients is a list of (endpoint, client)"""
+        self._nodes = [_Node(endpoint, client) for endpoint, client in clients]
+        self._lock = Lock()
+        self._next = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._nodes[0].client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kw):
+            return self._call(name, args, kw)
+
+        return call
+
+    def close(self):
+        for node in self._nodes:
+            node.client.close()
+
+    def stats(self):
+        """endpoint -> requests sent, outstanding requests, consecutive failures and whether it's ejected"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                node.endpoint: {
+                    "requests": node.requests,
+                    "outstanding": node.outstanding,
+                    "failures": node.failures,
+                    "ejected": node.ejected_until > now,
+                }
+                for node in self._nodes
+            }
+
+    def _call(self, op, args, kw):
+        node = self._pick()
+        try:
+            resp = getattr(node.client, op)(*args, **kw)
+        except Exception as err:
+            self._done(node, getattr(err, "status_code", None) or 500)
+            raise
+        self._done(node, getattr(resp, "status_code", 200))
+        return resp
+
+    def _pick(self):
+        now = time.monotonic()
+        with self._lock:
+            count = len(self._nodes)
+            # Round robin order from the node after the last pick
+            order = [self._nodes[(self._next + i) % count] for i in range(count)]
+            healthy = [node for node in order if node.ejected_until <= now]
+            if healthy:
+                node = min(healthy, key=lambda node: node.outstanding)
+            else:
+                node = min(order, key=lambda node: node.ejected_until)
+            self._next = (self._nodes.index(node) + 1) % count
+            node.outstanding += 1
+            node.requests += 1
+            return node
+
+    def _done(self, node, status_code):
+        with self._lock:
+            node.outstanding -= 1
+            if status_code < 500:
+                node.failures = 0
+                return
+            node.failures += 1
+            if node.failures >= _max_failures:
+                node.ejected_until = time.monotonic() + _eject_seconds
@@ -0,0 +1,96 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Codecs for V3ioFile block compression
+
+Each uploaded block is compressed as a separate frame (gzip member, zstd or lz4 frame). Concatenated frames are a
+valid stream for the codec, so compressed objects can also be read by other tools.
+"""
+import gzip
+import io
+from os.path import splitext
+
+suffixes = {
+    ".gz": "gzip",
+    ".zst": "zstd",
+    ".lz4": "lz4",
+}
+
+
+class _Gzip:
+    def compress(self, data):
+        return gzip.compress(data)
+
+    def decompress(self, data):
+        return gzip.decompress(data)
+
+
+class _Zstd:
+    def __init__(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression requires the zstandard package")
+        self._zstandard = zstandard
+
+    def compress(self, data):
+        return self._zstandard.ZstdCompressor().compress(data)
+
+    def decompress(self, data):
+        reader = self._zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        with reader:
+            return reader.read()
+
+
+class _Lz4:
+    def __init__(self):
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError("lz4 compression requires the lz4 package")
+        self._frame = lz4.frame
+
+    def compress(self, data):
+        return self._frame.compress(data)
+
+    def decompress(self, data):
+        out = []
+        while data:
+            decompressor = self._frame.LZ4FrameDecompressor()
+            out.append(decompressor.decompress(data))
+            data = decompressor.unused_data
+        return b"".join(out)
+
+
+_codecs = {
+    "gzip": _Gzip,
+    "zstd": _Zstd,
+    "lz4": _Lz4,
+}
+
+
+def get_codec(name, path):
+    """Codec by name, or by the suffix of path if name is "infer". None if there's no compression.
+
+    >>> get_codec("infer", "/bigdata/data.csv") is None
+    True
+    >>> get_codec("infer", "/bigdata/data.csv.gz").__class__.__name__
+    '_Gzip'
+    """
+    if name == "infer":
+        name = suffixes.get(splitext(path)[1])
+    if name is None:
+        return None
+    if name not in _codecs:
+        raise ValueError(f"unknown codec: {name!r}")
+    return _codecs[name]()
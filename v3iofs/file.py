@@ -13,25 +13,216 @@
 # limitations under the License.
 
 
-import v3io
+import io
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from math import inf
+from typing import TYPE_CHECKING
+
 from fsspec.spec import AbstractBufferedFile
-from v3io.dataplane import Client
 
+from .compression import get_codec
+from .memory import _BudgetCache
 from .path import split_container
-from .utils import handle_v3io_errors
+from .utils import RaiseForStatus, handle_v3io_errors
+
+if TYPE_CHECKING:
+    from v3io.dataplane import Client
+
+# Object attribute holding the frame offsets of compressed objects
+_frames_attr = "v3iofs_frames"
 
 
 class V3ioFile(AbstractBufferedFile):
+    """File object for v3io
+
+    Parameters
+    ----------
+    data: bytes | None
+        Whole object content, when it was already read by V3ioFS._open
+    head: bytes | None
+        First bytes of the object, when they were already read by V3ioFS._open
+    info: dict | None
+        Result of V3ioFS.info for path, when it's already known
+    attributes: dict | None
+        In write mode, user attributes (name -> str, int, float or bytes) to set on the object once it's written.
+        Read them back with ``V3ioFS.info(path, attributes=[...])``. Names starting with "__" are reserved.
+    background_upload: bool
+        In write mode, send each block on a background thread while the next one is being filled. Blocks are
+        still sent one at a time and in order, errors are raised by the following write, flush or close, and the
+        object size is checked once the file is closed. Default is False.
+    autocommit: bool
+        If False (inside a transaction), written data is staged in a local temporary file and only uploaded to
+        path by commit(), in a single put. Readers see either the previous object or the whole new one, but the
+        staged data is held in memory while it's sent. Default is True.
+    codec: str | None
+        Compress each block with "gzip", "zstd" or "lz4", or pick the codec from the path suffix with "infer".
+        The offsets of the compressed frames are stored in an object attribute, so ranged reads only fetch and
+        decompress the frames they need. The size, offsets and reads of such a file are those of the
+        uncompressed data, while V3ioFS.info, size, cat_file and read_block (which have no codec) are those of
+        the stored, compressed bytes. Default is None (no compression).
+    **kw:
+        Passed to fsspec.AbstractBufferedFile
+    """
+
+    def __init__(
+        self,
+        fs,
+        path,
+        mode="rb",
+        data=None,
+        head=None,
+        info=None,
+        attributes=None,
+        background_upload=False,
+        autocommit=True,
+        codec=None,
+        **kw,
+    ):
+        self._data = data
+        self._head = head
+        self._attributes = dict(attributes or {})
+        reserved = [name for name in self._attributes if name.startswith("__")]
+        if reserved:
+            raise ValueError(f"reserved attribute names: {reserved!r}")
+        self._codec = get_codec(codec, path) if codec else None
+        # Uncompressed and compressed offsets of the frames when using a codec
+        self._frames = [(0, 0)]
+        self._uploader = ThreadPoolExecutor(1) if background_upload and autocommit and mode != "rb" else None
+        self._staging = None
+        self._pending_upload = None
+        self._uploaded = 0
+        # Fetches that continued the previous one and fetches elsewhere, to tell sequential reads from random ones
+        self._fetch_end = None
+        self._sequential_fetches = self._random_fetches = 0
+        # Write mode replaces the object with the first put, instead of deleting it up front
+        self._append = "a" in mode
+        # (size, mtime) of the object when it was opened for reading, None if only its size is known
+        self._version = None
+        if self._codec is not None and mode == "rb":
+            kw["size"] = self._load_frames(fs, path)
+        elif info is not None:
+            kw["size"] = info["size"]
+        super().__init__(fs, path, mode=mode, autocommit=autocommit, **kw)
+        if info is not None:
+            self.details = info
+        if mode == "rb" and self._codec is None and self._details is not None:
+            self._version = (self._details["size"], self._details.get("mtime"))
+        if fs._memory is not None and mode == "rb" and kw.get("cache_type") != "none":
+            self.cache = _BudgetCache(self.blocksize, self._fetch_range, self.size, fs._memory, id(self))
+
+    def write(self, data):
+        out = super().write(data)
+        memory = self.fs._memory
+        if memory is not None and memory.buffered(id(self), self.buffer.tell()):
+            # Flush early to stay within the memory budget, V3ioFile blocks can be of any size
+            if self.offset is None:
+                self.offset = 0
+                self._initiate_upload()
+            if self._upload_chunk(final=False) is not False:
+                self.offset += self.buffer.seek(0, 2)
+                self.buffer = io.BytesIO()
+            memory.buffered(id(self), 0)
+        return out
+
+    def revalidate(self):
+        """Check whether the file changed since it was opened, with a single info request
+
+        The cached blocks are kept if the size and mtime of the file didn't change. Otherwise they are dropped
+        and the file is read with its new size. A file opened with just a size has no mtime to compare, it's
+        always read again.
+
+        Returns
+        -------
+        bool
+            True if the file changed
+        """
+        if self.mode != "rb":
+            raise ValueError("revalidate is only for files opened for reading")
+        info = self.fs._file_info("/" + self.path.lstrip("/"))
+        if info is None:
+            raise FileNotFoundError(self.path)
+        if (info["size"], info["mtime"]) == self._version:
+            return False
+
+        self.details = info
+        self._version = (info["size"], info["mtime"])
+        self._data = self._head = None
+        self.size = info["size"]
+        if self._codec is not None:
+            self.size = self._load_frames(self.fs, self.path)
+        if isinstance(self.cache, _BudgetCache):
+            self.fs._memory.release(id(self))
+            self.cache = _BudgetCache(self.blocksize, self._fetch_range, self.size, self.fs._memory, id(self))
+        else:
+            self.cache = type(self.cache)(self.blocksize, self._fetch_range, self.size)
+        return True
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self.fs is not None and self.fs._memory is not None:
+                self.fs._memory.release(id(self))
+            fetches = self._sequential_fetches + self._random_fetches
+            if self.fs is not None and self.fs._tuner is not None and fetches > 1:
+                self.fs._tuner.record_pattern(self.path, self._random_fetches > self._sequential_fetches)
+
     def _fetch_range(self, start, end):
-        client: Client = self.fs._client
+        if self._data is not None:
+            return self._data[start:end]
+        if self._fetch_end is not None:
+            if start == self._fetch_end:
+                self._sequential_fetches += 1
+            else:
+                self._random_fetches += 1
+        self._fetch_end = end
+
+        head = self._head or b""
+        if start < len(head):
+            if end <= len(head):
+                return head[start:end]
+            return head[start:] + self._fetch_remote(len(head), end)
+        return self._fetch_remote(start, end)
+
+    def _fetch_remote(self, start, end):
+        """Bytes [start, end), from the caches of the file system or the object"""
+        if self._codec is None:
+            if self.fs._footers is not None and start >= self.size - self.fs._footer_size:
+                # The details are filled in when the size is looked up
+                offset, data = self.fs._footer(self.path, self.size, self.details.get("mtime"))
+                start, end = start - offset, end - offset
+                return data[start:end]
+            mtime = self.details.get("mtime")
+            if self.fs._blocks is not None and mtime is not None:
+                return self.fs._cached_range(self.path, self.size, mtime, start, end, self._get_range)
+            return self._get_range(start, end)
+
+        # Fetch and decompress the frames covering [start, end)
+        end = min(end, self._frames[-1][0])
+        if start >= end:
+            return b""
+        first = bisect_right(self._frames, (start, inf)) - 1
+        last = bisect_left(self._frames, (end, 0))
+        ustart, cstart = self._frames[first]
+        data = self._codec.decompress(self._get_range(cstart, self._frames[last][1]))
+        start, end = start - ustart, end - ustart
+        return data[start:end]
+
+    def _get_range(self, start, end):
         container, path = split_container(self.path)
         nbytes = end - start
 
-        resp = client.get_object(
-            container, path, offset=start, num_bytes=nbytes, raise_for_status=v3io.dataplane.RaiseForStatus.never
+        started = time.monotonic()
+        resp = self.fs._idempotent(
+            "get_object", container, path, offset=start, num_bytes=nbytes, raise_for_status=RaiseForStatus.never
         )
 
-        return handle_v3io_errors(resp, path)
+        data = handle_v3io_errors(resp, path)
+        self.fs._transferred("read", len(data), started)
+        return data
 
     def _upload_chunk(self, final=False):
         """Write one part of a multi-block file upload
@@ -42,25 +233,150 @@ class V3ioFile(AbstractBufferedFile):
             This is the last block, so should complete file, if
             self.autocommit is True.
         """
+        if not self.autocommit:
+            if self._staging is None:
+                self._staging = tempfile.SpooledTemporaryFile(max_size=self.blocksize)
+            self._staging.write(self.buffer.getbuffer())
+            return True
+
         body = self.buffer.getvalue()
-        if not body:
-            return
+        # In write mode the first put replaces the object, so it's sent even if nothing was written
+        if body or (final and not self._append):
+            if self._uploader is None:
+                self._put(body, self._append)
+            else:
+                # Wait for the previous block, puts must reach the object in order
+                self._wait_upload()
+                self._pending_upload = self._uploader.submit(self._put, body, self._append)
+            self._append = True
+
+        if final and self._uploader is not None:
+            self._wait_upload()
+            self._uploader.shutdown()
+            self._check_size()
+        if final:
+            self._save_attributes()
+        # No need to clear self.buffer, fsspec does that
+        return True
 
+    def _put(self, body, append):
+        self._send(self._frame(body), append)
+
+    def _frame(self, body):
+        """Compress body into the next frame when using a codec"""
+        if self._codec is None:
+            return body
+        size = len(body)
+        body = self._codec.compress(body)
+        uoffset, coffset = self._frames[-1]
+        self._frames.append((uoffset + size, coffset + len(body)))
+        return body
+
+    def _send(self, body, append):
         client: Client = self.fs._client
         container, path = split_container(self.path)
+        start = time.monotonic()
         resp = client.put_object(
             container,
             path,
             body=body,
-            append=True,
-            raise_for_status=v3io.dataplane.RaiseForStatus.never,
+            append=append,
+            raise_for_status=RaiseForStatus.never,
         )
 
-        if handle_v3io_errors(resp, path):
-            # No need to clear self.buffer, fsspec does that
-            return True
+        handle_v3io_errors(resp, path)
+        self.fs._transferred("write", len(body), start)
+        self._uploaded += len(body)
+
+    def _wait_upload(self):
+        pending, self._pending_upload = self._pending_upload, None
+        if pending is not None:
+            pending.result()
+
+    def _remote_size(self):
+        client: Client = self.fs._client
+        container, path = split_container(self.path)
+        resp = client.get_item(container, path, attribute_names=["__size"], raise_for_status=RaiseForStatus.never)
+        if resp.status_code == 404:
+            return 0
+        handle_v3io_errors(resp, path)
+        return int(resp.output.item["__size"])
+
+    def _check_size(self):
+        size = self._remote_size()
+        if size != self._uploaded:
+            raise IOError(f"{self.path!r} has {size} bytes after upload, expected {self._uploaded}")
+
+    def commit(self):
+        """Upload the data staged while autocommit was off"""
+        if self._staging is None:
+            self._staging = tempfile.SpooledTemporaryFile()  # Nothing was written
+
+        # One put, so the object never has part of the staged data. Frames are still a block each.
+        self._staging.seek(0)
+        frames = []
+        for body in iter(lambda: self._staging.read(self.blocksize), b""):
+            frames.append(self._frame(body))
+        if frames or not self._append:
+            self._send(b"".join(frames), self._append)
+        self._append = True
+
+        self._save_attributes()
+        self.discard()
+        self.fs.invalidate_cache(self.path)
+
+    def discard(self):
+        """Drop the data staged while autocommit was off"""
+        if self._staging is not None:
+            self._staging.close()
+            self._staging = None
+
+    def _load_frames(self, fs, path):
+        """Load the frame offsets of a compressed object, return its uncompressed size"""
+        container, path_without_container = split_container(path)
+        resp = fs._client.get_item(
+            container,
+            path_without_container,
+            attribute_names=["__size", "__mtime_secs", "__mtime_nsecs", _frames_attr],
+            raise_for_status=RaiseForStatus.never,
+        )
+        handle_v3io_errors(resp, path)
+        item = resp.output.item
+        mtime = int(item["__mtime_secs"]) + int(item["__mtime_nsecs"]) / 10**9
+        self._version = (item["__size"], mtime)
+
+        frames = resp.output.item.get(_frames_attr)
+        if frames:
+            frames = [tuple(int(offset) for offset in frame.split(":")) for frame in frames.split(",")]
+        # Objects written by other tools (or rewritten since) are decompressed as a whole
+        if not frames or frames[-1][1] != int(resp.output.item["__size"]):
+            if self._append:
+                raise ValueError(f"can't append to {path!r}: no frame offsets")
+            resp = fs._client.get_object(container, path_without_container, raise_for_status=RaiseForStatus.never)
+            self._data = self._codec.decompress(handle_v3io_errors(resp, path))
+            return len(self._data)
+
+        self._frames = frames
+        return frames[-1][0]
+
+    def _save_attributes(self):
+        """Set the user attributes, and the frame offsets when using a codec, on the written object"""
+        attributes = dict(self._attributes)
+        if self._codec is not None:
+            attributes[_frames_attr] = ",".join(f"{uoffset}:{coffset}" for uoffset, coffset in self._frames)
+        if not attributes:
+            return
+
+        client: Client = self.fs._client
+        container, path = split_container(self.path)
+        resp = client.update_item(container, path, attributes=attributes, raise_for_status=RaiseForStatus.never)
+        handle_v3io_errors(resp, path)
 
     def _initiate_upload(self):
         """Create remote file/upload"""
-        if "a" not in self.mode:
-            self.fs.rm_file(self.path)
+        if self._append and self._codec is not None:
+            if self._remote_size():
+                self._load_frames(self.fs, self.path)
+        if self._append and self._uploader is not None:
+            # Count existing bytes for the size check
+            self._uploaded = self._remote_size()
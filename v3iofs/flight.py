@@ -0,0 +1,71 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Single flight: concurrent identical requests share one request and its result"""
+from concurrent.futures import Future
+from threading import Lock
+
+
+class _SingleFlight:
+    """Runs one call per key at a time, callers of a key that's already running wait for its result (or error)"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._flights = {}
+        self.shared = 0
+
+    def call(self, key, fn, *args, **kw):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return flight.result()
+
+        try:
+            result = fn(*args, **kw)
+        except BaseException as err:
+            flight.set_exception(err)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def forget(self):
+        """Have the following calls start new requests, instead of waiting for the ones running"""
+        with self._lock:
+            self._flights.clear()
+
+
+def request_key(op, args, kw):
+    """Hashable key of a client request, None if an argument can't be part of one
+
+    >>> request_key("get_item", ("bigdata", "a"), {"attribute_names": ["__size"], "raise_for_status": "never"})
+    ('get_item', ('bigdata', 'a'), (('attribute_names', ('__size',)), ('raise_for_status', 'never')))
+    >>> request_key("put_item", ("bigdata", "a"), {"attributes": {"a": 1}}) is None
+    True
+    """
+    items = tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in kw.items()))
+    key = (op, tuple(args), items)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
@@ -11,36 +11,67 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+import os
+import sqlite3
 import time
 import traceback
 import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from functools import partial
+from glob import has_magic
+from itertools import groupby
 from os import environ
 from threading import Lock
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-import v3io
 from fsspec.spec import AbstractFileSystem
-from v3io.dataplane import Client
+from fsspec.transaction import Transaction
 
+from .appender import Appender
+from .balance import _BalancedClient
 from .file import V3ioFile
-from .path import path_equal, split_container, strip_schema, unslash
-from .utils import handle_v3io_errors
+from .flight import _SingleFlight, request_key
+from .hedge import _Hedger
+from .index import _Index, encode_index, index_path
+from .memory import _BlockCache, _MemoryBudget
+from .path import split_container, strip_schema, unslash
+from .prefetch import Prefetch
+from .trace import _TracingClient
+from .tuning import _Tuner
+from .utils import RaiseForStatus, handle_v3io_errors
+
+if TYPE_CHECKING:
+    from v3io.dataplane import Client
 
 _file_key = "key"
 _dir_key = "prefix"
+# Matches the number of connections of the v3io client
+_max_workers = 8
+# Deleted paths whose cached info, listings and blocks are dropped together by rm
+_rm_invalidate_batch = 1000
+_transfer_chunk_size = 16 * 2**20
+# Read past the end of a block by read_block, to find the delimiter ending its last record
+_block_overlap = 2**16
+# Size of the blocks of the shared block cache
+_cache_block_size = 2**20
 
 
 class _Cache:
-    def __init__(self, capacity, cache_validity_seconds):
+    def __init__(self, capacity, cache_validity_seconds, stale_seconds=0):
         self._cache = {}
         self._expiry_to_key = []
         self._capacity = capacity
         self._cache_validity_seconds = cache_validity_seconds
+        # Entries are kept this long after they're no longer valid, for get_stale
+        self._stale_seconds = stale_seconds
 
     def put(self, key, value):
         now = time.monotonic()
-        expiry = now + self._cache_validity_seconds
+        expiry = now + self._cache_validity_seconds + self._stale_seconds
 
         self._cache[key] = (expiry, value)
         self._expiry_to_key.append((expiry, key))
@@ -50,21 +81,34 @@ class _Cache:
             self._gc(now)
 
     def get(self, key):
+        value, stale = self.get_stale(key)
+        return None if stale else value
+
+    def get_stale(self, key):
+        """(value, True if it's no longer valid), (None, False) if there's no value"""
         lookup_result = self._cache.get(key)
         if lookup_result is None:
-            return None
+            return None, False
         expiry, value = lookup_result
         now = time.monotonic()
         if now <= expiry:
-            return value
+            return value, now > expiry - self._stale_seconds
 
         self._gc(now)
 
-        return None
+        return None, False
 
     def delete_if_exists(self, key):
         self._cache.pop(key, None)
 
+    def delete_many(self, keys):
+        for key in keys:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        self._cache.clear()
+        self._expiry_to_key.clear()
+
     def _gc(self, until):
         num_removed = 0
         for expiry, key in self._expiry_to_key:
@@ -82,20 +126,254 @@ class _Cache:
         self._expiry_to_key = self._expiry_to_key[num_removed:]
 
 
+class _SqliteCache:
+    """_Cache kept in a sqlite file, shared by all processes that open the same file"""
+
+    def __init__(self, path, capacity, cache_validity_seconds, stale_seconds=0):
+        # Callers serialize access with V3ioFS._cache_lock, sqlite locking covers other processes
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expiry REAL, value TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expiry)")
+        self._capacity = capacity
+        self._cache_validity_seconds = cache_validity_seconds
+        self._stale_seconds = stale_seconds
+
+    def put(self, key, value):
+        # Wall clock time, monotonic clocks aren't comparable between processes
+        now = time.time()
+        expiry = now + self._cache_validity_seconds + self._stale_seconds
+        self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, expiry, json.dumps(value)))
+
+        # GC
+        self._db.execute("DELETE FROM cache WHERE expiry <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expiry LIMIT "
+            "max(0, (SELECT count(*) FROM cache) - ?))",
+            (self._capacity,),
+        )
+
+    def get(self, key):
+        value, stale = self.get_stale(key)
+        return None if stale else value
+
+    def get_stale(self, key):
+        row = self._db.execute("SELECT expiry, value FROM cache WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or row[0] < now:
+            return None, False
+        return json.loads(row[1]), now > row[0] - self._stale_seconds
+
+    def delete_if_exists(self, key):
+        self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_many(self, keys):
+        # In a single transaction
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache")
+
+
+class _FooterCache:
+    """Tails of objects, valid while the object keeps the same size and mtime. Least recently used entries are
+    dropped beyond capacity.
+
+    With a path, entries are also kept in a sqlite file shared by all processes that open the same file.
+    """
+
+    def __init__(self, capacity, path=None):
+        self._entries = OrderedDict()
+        self._capacity = capacity
+        self._lock = Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS footers "
+                "(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, offset INTEGER, data BLOB, used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS footers_used ON footers (used)")
+
+    def get(self, path, size, mtime):
+        """(offset, data) of the tail of path, None if it's missing or stale"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT size, mtime, offset, data FROM footers WHERE path = ?", (path,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1], row[2], bytes(row[3]))
+                    self._add(path, entry)
+            if entry is None or entry[:2] != (size, mtime):
+                return None
+            self._entries.move_to_end(path)
+            return entry[2:]
+
+    def put(self, path, size, mtime, offset, data):
+        with self._lock:
+            self._add(path, (size, mtime, offset, data))
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO footers VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime, offset, data, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM footers WHERE path IN (SELECT path FROM footers ORDER BY used LIMIT "
+                "max(0, (SELECT count(*) FROM footers) - ?))",
+                (self._capacity,),
+            )
+
+    def _add(self, path, entry):
+        self._entries[path] = entry
+        self._entries.move_to_end(path)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+
+class _BulkDelete:
+    """Deletes paths on a thread pool, bounding the number of deletes in flight
+
+    The caches of deleted paths are invalidated in batches of _rm_invalidate_batch, and for the last batch
+    when leaving the with block.
+    """
+
+    def __init__(self, fs, max_workers, callback):
+        self._fs = fs
+        max_workers = max_workers or _max_workers
+        self._pool = ThreadPoolExecutor(max_workers)
+        self._max_in_flight = 4 * max_workers
+        self._in_flight = deque()
+        self._callback = callback
+        self._deleted = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown(wait=True)
+        # Also when a delete failed, for the paths that are gone
+        self._invalidate()
+
+    def submit(self, path):
+        future = self._pool.submit(self._fs._delete_object, path)
+        self._in_flight.append((path, future))
+        while len(self._in_flight) > self._max_in_flight:
+            self._done(*self._in_flight.popleft())
+
+    def wait(self):
+        while self._in_flight:
+            self._done(*self._in_flight.popleft())
+
+    def _done(self, path, future):
+        future.result()
+        self._deleted.append(path)
+        if len(self._deleted) >= _rm_invalidate_batch:
+            self._invalidate()
+        if self._callback is not None:
+            self._callback.relative_update(1)
+
+    def _invalidate(self):
+        deleted, self._deleted = self._deleted, []
+        if deleted:
+            self._fs._invalidate_paths(deleted)
+
+
+class _Transaction(Transaction):
+    """Transaction that commits its files concurrently"""
+
+    def complete(self, commit=True):
+        files = list(self.files)
+        self.files.clear()
+        try:
+            if commit:
+                with ThreadPoolExecutor(_max_workers) as pool:
+                    list(pool.map(lambda f: f.commit(), files))
+        finally:
+            # Files that were committed have nothing left to discard
+            for f in files:
+                f.discard()
+            super().complete(commit)
+
+
 class V3ioFS(AbstractFileSystem):
     """File system driver to v3io
 
     Parameters
     ----------
-    v3io_api: str
-        API host name (or V3IO_API environment)
+    v3io_api: str | list of str
+        API host name (or V3IO_API environment). Several web gateway nodes, as a list or comma separated, spread
+        the requests between them: each request goes to the node with the fewest outstanding requests, and nodes
+        that keep failing are left out for a while. See endpoint_stats().
     v3io_access_key: str
         v3io access key (or V3IO_ACCESS_KEY from environment)
     cache_validity_seconds: int | str | None
-        use caching for info(), with invalidation after cache_validity_seconds. Default is 2. Set to 0 to disable.
+        use caching for info() (and ls() with cache_listings), with invalidation after cache_validity_seconds.
+        Default is 2. Set to 0 to disable.
+    cache_listings: bool
+        also cache complete ls() results. Listings then don't show changes made by other clients until they
+        expire. Default is False.
+    cache_stale_seconds: int | str | None
+        keep cached results this many seconds past cache_validity_seconds. Such stale results are returned right
+        away, while they're refreshed in the background. Default is 0 (expired results are fetched again before
+        returning).
     cache_capacity: int | str | None
         limits the size of the cache. If cache_validity_seconds is not set, this parameter has no effect.
         Default is 128.
+    shared_cache_path: str | None
+        keep the cache in this local sqlite file instead of in memory, sharing it between all the processes on
+        the host that use the same file. If cache_validity_seconds is not set, this parameter has no effect.
+    small_object_size: int | str | None
+        objects smaller than this are read in a single request when opened for reading, without first probing
+        their size. Default is 64KiB. Set to 0 to disable.
+    footer_size: int | str | None
+        the last footer_size bytes of an object (where parquet and similar formats keep their metadata) are read
+        in one request the first time a read falls within them, and kept for the following reads of any file
+        handle of this file system, until the object changes size or mtime. 65536 is the size of the footer read
+        by pyarrow. Default is 0 (no footer cache).
+    footer_cache_capacity: int | str | None
+        maximal number of objects whose footers are kept, the cache holds up to footer_cache_capacity *
+        footer_size bytes. Default is 1024.
+    footer_cache_path: str | None
+        also keep the footers in this local sqlite file, sharing them between all the processes on the host
+        that use the same file and across restarts.
+    hedge_percentile: float | None
+        hedge reads (ranged object reads, info and listing pages): a read that takes longer than this percentile
+        (0-100) of the recent latencies of its operation is sent again, and the first response is used. Default
+        is None (no hedging).
+    hedge_budget: float | None
+        maximal fraction of extra requests sent by hedging. Default is 0.05.
+    memory_budget: int | str | None
+        bytes shared by the read caches and write buffers of all the files opened by this file system. Reads are
+        cached in blocks of block_size, and when over budget the least recently used blocks (of any file) are
+        dropped and then the largest write buffer is uploaded early, by its next write. See memory_stats().
+        Default is None (no budget, each file has its own cache).
+    block_cache_size: int | str | None
+        keep up to this many bytes of the objects read through this file system in a block cache shared by all
+        its files, so reopening a file (or opening it in many threads) reads it from memory. Blocks are kept
+        per object mtime, so a changed object is read again (once its info isn't cached). See
+        block_cache_stats(). Default is None (no shared cache).
+    auto_block_size: tuple of (int | str) | None
+        (min, max) bytes. Files opened without a block_size get one within these bounds, from the latency and
+        bandwidth of recent transfers: a few times the bandwidth-delay product for writes and sequential reads,
+        and a fraction of it for paths whose previous reader accessed them at random. See
+        transfer_stats(). Default is None (the fsspec default block size).
+    indexes: list of str | None
+        serve ls, info, find and glob under these directories from their index (see build_index), in a single
+        request. An index is used as long as the mtime of its directory didn't change since it was built, and
+        until something is written under the directory through this file system.
+    trace_path: str | None
+        record every v3io request (operation, path, offsets, status, latency and thread) to this file, as JSON
+        lines. See v3iofs.trace for replaying a trace.
     debug: bool
         Turn on transport debug logs. Default is False.
     **kw:
@@ -103,40 +381,132 @@ class V3ioFS(AbstractFileSystem):
     """
 
     protocol = "v3io"
+    transaction_type = _Transaction
 
     def __init__(
-        self, v3io_api=None, v3io_access_key=None, cache_validity_seconds=None, cache_capacity=None, debug=False, **kw
+        self,
+        v3io_api=None,
+        v3io_access_key=None,
+        cache_validity_seconds=None,
+        cache_listings=False,
+        cache_stale_seconds=None,
+        cache_capacity=None,
+        shared_cache_path=None,
+        small_object_size=None,
+        footer_size=None,
+        footer_cache_capacity=None,
+        footer_cache_path=None,
+        hedge_percentile=None,
+        hedge_budget=None,
+        indexes=None,
+        memory_budget=None,
+        block_cache_size=None,
+        auto_block_size=None,
+        trace_path=None,
+        debug=False,
+        **kw,
     ):
         # TODO: Support storage options for creds (in kw)
         super().__init__(**kw)
         self._client = _new_client(v3io_api, v3io_access_key, debug)
+        self._balancer = self._client if isinstance(self._client, _BalancedClient) else None
+        if trace_path is not None:
+            self._client = _TracingClient(self._client, trace_path)
         self._cache = None
+        self._cache_listings = cache_listings
         if cache_validity_seconds is None:
             cache_validity_seconds = 2
         if cache_capacity is None:
             cache_capacity = 128
         if cache_validity_seconds > 0:
-            self._cache = _Cache(int(cache_capacity), int(cache_validity_seconds))
+            cache_cls = _Cache if shared_cache_path is None else partial(_SqliteCache, shared_cache_path)
+            stale_seconds = int(cache_stale_seconds or 0)
+            self._cache = cache_cls(int(cache_capacity), int(cache_validity_seconds), stale_seconds)
             self._cache_lock = Lock()
+            # Keys being refreshed in the background
+            self._refreshing = set()
+            self._refresher = ThreadPoolExecutor(2, thread_name_prefix="v3iofs-refresh") if stale_seconds else None
+        if small_object_size is None:
+            small_object_size = 64 * 1024
+        self._small_object_size = int(small_object_size)
+        if footer_size is None:
+            footer_size = 0
+        if footer_cache_capacity is None:
+            footer_cache_capacity = 1024
+        self._footer_size = int(footer_size)
+        self._footers = None
+        if self._footer_size > 0:
+            self._footers = _FooterCache(int(footer_cache_capacity), footer_cache_path)
+        self._flights = _SingleFlight()
+        self._hedger = None
+        if hedge_percentile is not None:
+            if hedge_budget is None:
+                hedge_budget = 0.05
+            self._hedger = _Hedger(float(hedge_percentile), float(hedge_budget))
+        self._memory = None if memory_budget is None else _MemoryBudget(int(memory_budget))
+        self._blocks = None if block_cache_size is None else _BlockCache(int(block_cache_size), _cache_block_size)
+        self._tuner = None
+        if auto_block_size is not None:
+            min_size, max_size = auto_block_size
+            self._tuner = _Tuner(int(min_size), int(max_size))
+        # root -> _Index, None if not loaded yet or False if it can't be used
+        self._indexes = {"/" + unslash(self._strip_protocol(root)): None for root in indexes or []}
+        self._index_lock = Lock()
+        # Incremented when indexes are invalidated, so loads that overlap an invalidation aren't kept
+        self._index_generation = 0
         weakref.finalize(self, lambda: self._client.close())
 
     def ls(self, path, detail=True, marker=None, **kwargs):
-        """Lists files & directories under path"""
+        """Lists files & directories under path
+
+        With ``attributes`` (a list of user attribute names) and detail, the entries of files also have the
+        values of these attributes, when set.
+        """
 
         path = strip_schema(path)
+        attributes = kwargs.get("attributes")
+        if attributes and detail:
+            # Neither cached nor served from indexes, which only have the system attributes
+            return self._ls_with_attributes(path, marker, kwargs.get("limit"), attributes)
+
+        index = self._index_of(path)
+        if index is not None:
+            return index.ls("/" + unslash(path), detail)
+
         container, path = split_container(path)
         if not container:
             return self._list_containers(detail)
-        ext_out = []
 
         limit = kwargs.get("limit", None)
-
+        # Only complete listings are cached
+        if not self._cache or not self._cache_listings or marker is not None or limit is not None:
+            return self._ls(container, path, detail, marker, limit)
+
+        key = _ls_key(f"/{container}/{path}", detail)
+        with self._cache_lock:
+            lookup_result, stale = self._cache.get_stale(key)
+        if lookup_result is not None:
+            if stale:
+                self._revalidate(key, partial(self._cached_ls, key, container, path, detail))
+            return list(lookup_result)
+
+        return list(self._cached_ls(key, container, path, detail))
+
+    def _cached_ls(self, key, container, path, detail):
+        out = self._ls(container, path, detail, None, None)
+        with self._cache_lock:
+            self._cache.put(key, out)
+        return out
+
+    def _ls(self, container, path, detail, marker, limit):
+        ext_out = []
         while True:
-            resp = self._client.get_container_contents(
+            resp = self._idempotent(
+                "get_container_contents",
                 container=container,
                 path=path,
                 get_all_attributes=True,
-                raise_for_status=v3io.dataplane.RaiseForStatus.never,
+                raise_for_status=RaiseForStatus.never,
                 limit=limit,
                 marker=marker,
             )
@@ -161,41 +531,232 @@ class V3ioFS(AbstractFileSystem):
                 break
         return ext_out
 
-    def _ls_file(self, container, path, detail, marker=None):
-        # '/a/b/c' -> ('/a/b', 'c')
-        dirname, _, filename = path.rpartition("/")
-        while True:
-            resp = self._client.get_container_contents(
-                container=container,
-                path=dirname,
-                get_all_attributes=True,
-                raise_for_status=v3io.dataplane.RaiseForStatus.never,
+    def _ls_with_attributes(self, path, marker, limit, attributes):
+        container, path = split_container(path)
+        if not container:
+            return self._list_containers(True)
+
+        dirname = unslash(path)
+        out = self._ls(container, path, True, marker, limit)
+        if len(out) == 1 and out[0]["type"] == "file" and out[0]["name"] == f"/{container}/{dirname}":
+            return [self._file_info(out[0]["name"], attributes)]
+
+        # One scan of the directory returns the attributes of all its objects
+        files = {entry["name"]: entry for entry in out if entry["type"] == "file"}
+        prefix = f"/{container}/{dirname}/" if dirname else f"/{container}/"
+        marker = None
+        while files:
+            resp = self._idempotent(
+                "get_items",
+                container,
+                f"{dirname}/",
+                attribute_names=["__name"] + list(attributes),
                 marker=marker,
+                raise_for_status=RaiseForStatus.never,
             )
-
-            full_path = f"/{container}/{path}"
-            handle_v3io_errors(resp, full_path)
-            contents = getattr(resp.output, "contents", [])
-            objs = [obj for obj in contents if path_equal(obj.key, path)]
-            if not objs:
-                if hasattr(resp.output, "next_marker") and resp.output.next_marker:
-                    marker = resp.output.next_marker
-                else:
-                    raise FileNotFoundError(full_path)
-            else:
+            handle_v3io_errors(resp, prefix)
+            for item in resp.output.items:
+                entry = files.get(prefix + item["__name"])
+                if entry is not None:
+                    entry.update((name, item[name]) for name in attributes if name in item)
+            if resp.output.last or not resp.output.next_marker:
                 break
-
-        obj = objs[0]
+            marker = resp.output.next_marker
+        return out
+
+    def _ls_file(self, container, path, detail):
+        full_path = f"/{container}/{unslash(path)}"
+        entry = self._file_info(full_path)
+        if entry is None:
+            raise FileNotFoundError(full_path)
         if not detail:
             return full_path
-        return info_of(container, obj, _file_key)
+        return entry
+
+    def _idempotent(self, op, *args, **kw):
+        """Call the client method op, hedged if hedging is on. Only for requests that can safely be sent twice.
+
+        Concurrent identical requests (info, listing pages or ranges of the same path) share a single request.
+        """
+        key = request_key(op, args, kw)
+        if key is None:
+            return self._send(op, *args, **kw)
+        return self._flights.call(key, self._send, op, *args, **kw)
+
+    def _send(self, op, *args, **kw):
+        method = getattr(self._client, op)
+        if self._hedger is None:
+            return method(*args, **kw)
+        return self._hedger.call(op, method, *args, **kw)
 
     def _list_containers(self, detail):
-        resp = self._client.get_containers(raise_for_status=v3io.dataplane.RaiseForStatus.never)
+        resp = self._client.get_containers(raise_for_status=RaiseForStatus.never)
         handle_v3io_errors(resp, "containers")
         fn = container_info if detail else container_path
         return [fn(c) for c in resp.output.containers]
 
+    def invalidate_cache(self, path=None):
+        """Drop cached info, listings and blocks for path, or the whole cache if path is None"""
+        super().invalidate_cache(path)
+        if path is not None:
+            self._invalidate_paths([path])
+            return
+
+        self._invalidate_indexes(None)
+        self._flights.forget()
+        if self._blocks is not None:
+            self._blocks.drop()
+        if self._cache:
+            with self._cache_lock:
+                self._cache.clear()
+
+    def _invalidate_paths(self, paths):
+        """Drop the cached info and blocks of paths and the cached listings of paths and their parents, taking
+        each lock once"""
+        paths = [strip_schema(path) for path in paths]
+        normalized = {"/" + unslash(path) for path in paths}
+        self._invalidate_indexes(normalized)
+        # Requests that started before a change don't answer the ones that follow it
+        self._flights.forget()
+        if self._blocks is not None:
+            self._blocks.drop_many(normalized)
+        if not self._cache:
+            return
+
+        keys = set(paths) | normalized
+        for path in normalized:
+            for listed in (path, path.rpartition("/")[0]):
+                keys.update((_ls_key(listed, True), _ls_key(listed, False)))
+        with self._cache_lock:
+            self._cache.delete_many(keys)
+
+    def memory_stats(self):
+        """Usage of the memory budget: limit, used and peak bytes, number of read blocks, bytes in write buffers,
+        number of dropped blocks and early flushes. None without a memory budget."""
+        if self._memory is None:
+            return None
+        return self._memory.stats()
+
+    def block_cache_stats(self):
+        """Usage of the shared block cache: capacity and used bytes, number of blocks, block hits and misses,
+        hit rate and number of dropped blocks. None without block_cache_size."""
+        if self._blocks is None:
+            return None
+        return self._blocks.stats()
+
+    def endpoint_stats(self):
+        """Per web gateway node: requests sent, outstanding requests, consecutive failures and whether it's left
+        out. None with a single node."""
+        if self._balancer is None:
+            return None
+        return self._balancer.stats()
+
+    def transfer_stats(self):
+        """Measured latency (seconds), bandwidth (bytes/second) and chosen block size of reads and writes, None
+        without auto_block_size"""
+        if self._tuner is None:
+            return None
+        return self._tuner.stats()
+
+    def _cached_range(self, path, size, mtime, start, end, fetcher):
+        """Bytes [start, end) of the object at path from the shared block cache, fetcher(start, end) reads the
+        missing blocks"""
+        return self._blocks.read(_block_key(path), mtime, size, start, end, fetcher)
+
+    def _transferred(self, direction, nbytes, start):
+        """Record a request of nbytes that started at start (time.monotonic)"""
+        if self._tuner is not None:
+            self._tuner.record(direction, nbytes, time.monotonic() - start)
+
+    def build_index(self, path, max_workers=None):
+        """Write the index of the directory tree at path
+
+        Use the index with ``V3ioFS(indexes=[path])`` or ``use_index(path)``. Indexes are meant for data that
+        doesn't change, rebuild the index after changing files under path.
+
+        Parameters
+        ----------
+        path: str
+            Root directory of the tree, not a container
+        max_workers: int | None
+            Number of concurrent listings. Default is 8.
+
+        Returns
+        -------
+        str
+            Path of the index object
+        """
+        root = "/" + unslash(self._strip_protocol(path))
+        if not split_container(root)[1]:
+            raise ValueError(f"can't index a container: {path!r}")
+
+        # Don't list through an older index
+        self.invalidate_cache(root)
+        # Taken before listing, so changes made while listing make the index stale
+        mtime = self._dir_mtime(root)
+        entries = self._walk_tree(root, max_workers or _max_workers)
+        self.pipe_file(index_path(root), encode_index(root, mtime, entries))
+        if root in self._indexes:
+            self._indexes[root] = None
+        return index_path(root)
+
+    def use_index(self, path):
+        """Serve ls, info, find and glob under path from its index, see build_index"""
+        root = "/" + unslash(self._strip_protocol(path))
+        with self._index_lock:
+            self._indexes[root] = None
+
+    def _index_of(self, path):
+        """Loaded index covering path, None if there's none"""
+        if not self._indexes:
+            return None
+        path = "/" + unslash(path)
+        for root in self._indexes:
+            if path == root or path.startswith(root + "/"):
+                break
+        else:
+            return None
+
+        with self._index_lock:
+            index, generation = self._indexes[root], self._index_generation
+        if index is None:
+            # Not under the lock, loading takes requests and lists the parent directory
+            index = self._load_index(root)
+            with self._index_lock:
+                if generation != self._index_generation:
+                    return None  # Changed while loading
+                self._indexes[root] = index
+        return index or None
+
+    def _load_index(self, root):
+        container, path = split_container(index_path(root))
+        resp = self._idempotent("get_object", container, path, raise_for_status=RaiseForStatus.never)
+        if resp.status_code == 404:
+            return False
+        index = _Index(handle_v3io_errors(resp, index_path(root)))
+        if index.mtime is None or index.mtime != self._dir_mtime(root):
+            return False
+        return index
+
+    def _dir_mtime(self, path):
+        """mtime of directory path, from the listing of its parent"""
+        for entry in self.ls(path.rpartition("/")[0], detail=True):
+            if entry["name"] == path:
+                return entry.get("mtime")
+        raise FileNotFoundError(path)
+
+    def _invalidate_indexes(self, paths):
+        """Stop using the indexes covering any of paths (normalized), or reload all indexes if paths is None"""
+        if not self._indexes:
+            return
+        with self._index_lock:
+            self._index_generation += 1
+            for root in self._indexes:
+                if paths is None:
+                    self._indexes[root] = None
+                elif any(path == root or path.startswith(root + "/") for path in paths):
+                    self._indexes[root] = False
+
     def copy(self, path1, path2, **kwargs):
         ...  # FIXME
 
@@ -204,7 +765,121 @@ class V3ioFS(AbstractFileSystem):
             path += "/"
         self._rm(path)
 
+    def rm(self, path, recursive=False, maxdepth=None, callback=None, max_workers=None):
+        """Delete files or directories
+
+        Deletes are issued concurrently. When deleting recursively, files are sent to the delete workers as
+        listing pages arrive, and directories are deleted afterwards, deepest first.
+
+        Parameters
+        ----------
+        path: str | list
+            Files or directories to delete, glob patterns are expanded
+        recursive: bool
+            Delete directories and their content
+        maxdepth: int | None
+            Depth to descend to when deleting recursively. If set, falls back to fsspec's serial delete.
+        callback: fsspec.callbacks.Callback | None
+            Progress callback, updated once per deleted entry
+        max_workers: int | None
+            Number of concurrent deletes. Default is 8.
+        """
+        if maxdepth is not None:
+            return super().rm(path, recursive=recursive, maxdepth=maxdepth)
+
+        paths = self._expand_rm_paths(path if isinstance(path, (list, tuple)) else [path], recursive)
+        with _BulkDelete(self, max_workers, callback) as deleter:
+            dirs, missing = [], []
+            for path in paths:
+                if not recursive:
+                    deleter.submit(path)
+                    continue
+                found = self._rm_tree(path, deleter)
+                if found is None:
+                    missing.append(path)
+                else:
+                    dirs.extend(found)
+            # Like fsspec, a recursive rm fails only when none of the paths exist
+            if missing and len(missing) == len(paths):
+                raise FileNotFoundError(missing[0] if len(missing) == 1 else missing)
+            deleter.wait()
+
+            # Deepest directories first, each level only once the one below it is gone
+            dirs.sort(key=lambda d: d.count("/"), reverse=True)
+            for _, level in groupby(dirs, key=lambda d: d.count("/")):
+                for dirname in level:
+                    deleter.submit(dirname + "/")
+                deleter.wait()
+
+    def _expand_rm_paths(self, paths, recursive):
+        """Paths with their glob patterns expanded, without the paths under another one when recursive"""
+        expanded = []
+        for path in paths:
+            path = self._strip_protocol(path)
+            if not has_magic(path):
+                expanded.append(path)
+                continue
+            matches = self.glob(path)
+            if not matches:
+                raise FileNotFoundError(path)
+            expanded.extend(self._strip_protocol(match) for match in matches)
+        if not recursive:
+            return expanded
+
+        roots = []
+        for path in sorted(set(expanded)):
+            if not roots or not path.startswith(roots[-1].rstrip("/") + "/"):
+                roots.append(path)
+        return roots
+
+    def _rm_tree(self, path, deleter):
+        """Send all files under path to deleter, return the directories found (including path), None if path
+        doesn't exist"""
+        container, path_without_container = split_container(path)
+        if not container:
+            raise ValueError(f"bad path: {path!r}")
+
+        dirs = []
+        pending = [path_without_container]
+        while pending:
+            dirname = pending.pop()
+            marker = None
+            while True:
+                resp = self._client.get_container_contents(
+                    container=container,
+                    path=dirname,
+                    raise_for_status=RaiseForStatus.never,
+                    marker=marker,
+                )
+
+                if resp.status_code not in {200, 404}:
+                    raise Exception(f"{resp.status_code} received while listing {dirname!r}")
+
+                if resp.status_code == 404 or not _has_data(resp):
+                    if dirname == path_without_container:
+                        if resp.status_code == 404 and self._file_info("/" + unslash(path)) is None:
+                            return None
+                        deleter.submit(path)  # Not a directory
+                    break
+
+                for obj in getattr(resp.output, "contents", []):
+                    deleter.submit(obj_path(container, obj, _file_key))
+                for obj in getattr(resp.output, "common_prefixes", []):
+                    pending.append(unslash(obj.prefix))
+
+                if marker is None and dirname:
+                    dirs.append(f"/{container}/{dirname}")
+                if hasattr(resp.output, "next_marker") and resp.output.next_marker:
+                    marker = resp.output.next_marker
+                else:
+                    break
+        return dirs
+
     def _rm(self, path):
+        self._delete_object(path)
+        self.invalidate_cache(path)
+
+    def _delete_object(self, path):
         container, path_without_container = split_container(path)
         if not container:
             raise ValueError(f"bad path: {path:r}")
@@ -212,26 +887,239 @@ class V3ioFS(AbstractFileSystem):
         resp = self._client.delete_object(
             container=container,
             path=path_without_container,
-            raise_for_status=v3io.dataplane.RaiseForStatus.never,
+            raise_for_status=RaiseForStatus.never,
         )
 
         # Ignore 404's and 409's in delete
         if resp.status_code not in {200, 204, 404, 409}:
             raise Exception(f"{resp.status_code} received while accessing {path!r}")
 
-        if self._cache:
-            with self._cache_lock:
-                self._cache.delete_if_exists(path)
-
     def touch(self, path, truncate=True, **kwargs):
         if not truncate:  # TODO
             raise ValueError("only truncate touch supported")
 
         path = strip_schema(path)
-        container, path = split_container(path)
-        resp = self._client.put_object(container, path, raise_for_status=v3io.dataplane.RaiseForStatus.never)
+        container, path_without_container = split_container(path)
+        resp = self._client.put_object(container, path_without_container, raise_for_status=RaiseForStatus.never)
+
+        handle_v3io_errors(resp, path_without_container)
+        self.invalidate_cache(path)
+
+    def put_file(self, lpath, rpath, callback=None, chunk_size=None, **kw):
+        """Copy a local file to v3io
+
+        The local file is read in chunks of chunk_size bytes into a single reused buffer. The first chunk replaces
+        the object, the following ones are appended to it. Inside a transaction the file is staged like any file
+        written in it, and only uploaded when the transaction is committed.
+
+        Parameters
+        ----------
+        lpath: str
+            Local file path
+        rpath: str
+            Destination path
+        callback: fsspec.callbacks.Callback | None
+            Progress callback, updated with the number of bytes sent
+        chunk_size: int | None
+            Size of each request body. Default is 16MiB.
+        """
+        if os.path.isdir(lpath):
+            return  # v3io directories are created with the objects in them
+
+        rpath = self._strip_protocol(rpath)
+        container, path = split_container(rpath)
+        size = os.path.getsize(lpath)
+        if callback is not None:
+            callback.set_size(size)
+
+        if self._intrans:
+            with open(lpath, "rb") as fp, self.open(rpath, "wb") as out:
+                while True:
+                    data = fp.read(chunk_size or _transfer_chunk_size)
+                    if not data:
+                        break
+                    out.write(data)
+                    if callback is not None:
+                        callback.relative_update(len(data))
+            return
+
+        buf = memoryview(bytearray(min(chunk_size or _transfer_chunk_size, size)))
+        with open(lpath, "rb") as fp:
+            append = False
+            while True:
+                nbytes = fp.readinto(buf)
+                if not nbytes and append:
+                    break
+
+                resp = self._client.put_object(
+                    container,
+                    path,
+                    body=buf[:nbytes],
+                    append=append,
+                    raise_for_status=RaiseForStatus.never,
+                )
+                handle_v3io_errors(resp, rpath)
+                append = True
+                if callback is not None:
+                    callback.relative_update(nbytes)
+
+        self.invalidate_cache(rpath)
+
+    def get_file(self, rpath, lpath, callback=None, chunk_size=None, max_workers=None, **kw):
+        """Copy a v3io object to a local file
+
+        Ranges of chunk_size bytes are fetched concurrently and written to the local file in order.
+
+        Parameters
+        ----------
+        rpath: str
+            Source path
+        lpath: str
+            Local file path
+        callback: fsspec.callbacks.Callback | None
+            Progress callback, updated with the number of bytes received
+        chunk_size: int | None
+            Size of each ranged read. Default is 16MiB.
+        max_workers: int | None
+            Number of concurrent reads. Default is 8.
+        """
+        rpath = self._strip_protocol(rpath)
+        info = self.info(rpath)
+        if info["type"] == "directory":
+            os.makedirs(lpath, exist_ok=True)
+            return
+
+        self._download(rpath, lpath, int(info["size"]), callback, chunk_size, max_workers)
+
+    def _download(self, rpath, lpath, size, callback=None, chunk_size=None, max_workers=None):
+        container, path = split_container(rpath)
+        chunk_size = chunk_size or _transfer_chunk_size
+        max_workers = max_workers or _max_workers
+        if callback is not None:
+            callback.set_size(size)
+
+        def fetch(offset):
+            resp = self._client.get_object(
+                container,
+                path,
+                offset=offset,
+                num_bytes=min(chunk_size, size - offset),
+                raise_for_status=RaiseForStatus.never,
+            )
+            return handle_v3io_errors(resp, rpath)
+
+        with ThreadPoolExecutor(max_workers) as pool, open(lpath, "wb") as out:
+
+            def write(future):
+                body = future.result()
+                out.write(body)
+                if callback is not None:
+                    callback.relative_update(len(body))
+
+            in_flight = deque()
+            for offset in range(0, size, chunk_size):
+                in_flight.append(pool.submit(fetch, offset))
+                if len(in_flight) >= max_workers:
+                    write(in_flight.popleft())
+            while in_flight:
+                write(in_flight.popleft())
+
+    def sync(self, src, dst, delete=False, dry_run=False, max_workers=None):
+        """Copy new and changed files from src to dst
 
-        handle_v3io_errors(resp, path)
+        One of src and dst is a local directory and the other a ``v3io://`` URL. Both trees are listed (remote
+        directories concurrently), and a file is copied if it's missing from dst, has a different size, or is
+        newer in src than in dst. Copies run concurrently.
+
+        Parameters
+        ----------
+        src: str
+            Source directory
+        dst: str
+            Destination directory
+        delete: bool
+            Delete files in dst that are not in src. Default is False.
+        dry_run: bool
+            Only report what would be copied and deleted. Default is False.
+        max_workers: int | None
+            Number of concurrent listings and copies. Default is 8.
+
+        Returns
+        -------
+        dict
+            "copy": destination paths copied, "delete": destination paths deleted
+        """
+        upload = dst.startswith(f"{self.protocol}://")
+        if upload == src.startswith(f"{self.protocol}://"):
+            raise ValueError(f"exactly one of {src!r} and {dst!r} must be a {self.protocol}:// URL")
+
+        max_workers = max_workers or _max_workers
+        if upload:
+            src_root, dst_root = os.path.abspath(src), "/" + unslash(self._strip_protocol(dst))
+            src_files, dst_files = _list_local(src_root), self._list_tree(dst_root, max_workers)
+        else:
+            src_root, dst_root = "/" + unslash(self._strip_protocol(src)), os.path.abspath(dst)
+            src_files, dst_files = self._list_tree(src_root, max_workers), _list_local(dst_root)
+
+        to_copy = [
+            name
+            for name, (size, mtime) in src_files.items()
+            if name not in dst_files or dst_files[name][0] != size or dst_files[name][1] < mtime
+        ]
+        to_delete = [name for name in dst_files if name not in src_files] if delete else []
+        plan = {
+            "copy": [f"{dst_root}/{name}" for name in to_copy],
+            "delete": [f"{dst_root}/{name}" for name in to_delete],
+        }
+        if dry_run:
+            return plan
+
+        def copy(name):
+            if upload:
+                self.put_file(os.path.join(src_root, name), f"{dst_root}/{name}")
+                return
+            lpath = os.path.join(dst_root, name)
+            os.makedirs(os.path.dirname(lpath), exist_ok=True)
+            self._download(f"{src_root}/{name}", lpath, src_files[name][0], max_workers=1)
+
+        with ThreadPoolExecutor(max_workers) as pool:
+            list(pool.map(copy, to_copy))
+
+        if upload:
+            if plan["delete"]:
+                self.rm(plan["delete"], max_workers=max_workers)
+        else:
+            for path in plan["delete"]:
+                os.remove(path)
+        return plan
+
+    def _list_tree(self, root, max_workers):
+        """Map path relative to root -> (size, mtime) of all files under root, listing directories concurrently"""
+        start = len(root) + 1
+        return {
+            entry["name"][start:]: (entry["size"], entry["mtime"])
+            for entry in self._walk_tree(root, max_workers)
+            if entry["type"] == "file" and entry["name"] != root
+        }
+
+    def _walk_tree(self, root, max_workers):
+        """Yield the ls entries of everything under root, listing directories concurrently
+
+        Entries come in no particular order. Directories that disappear while walking are skipped.
+        """
+        with ThreadPoolExecutor(max_workers) as pool:
+            pending = {pool.submit(self.ls, root, detail=True)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        entries = future.result()
+                    except FileNotFoundError:
+                        continue
+                    for entry in entries:
+                        if entry["type"] == "directory":
+                            pending.add(pool.submit(self.ls, entry["name"], detail=True))
+                        yield entry
 
     def info(self, path, **kw):
         """Details of entry at path
@@ -243,6 +1131,8 @@ class V3ioFS(AbstractFileSystem):
         ----------
         path: str
             Path to get info for
+        attributes: list of str, optional
+            Names of user attributes to add to the info of a file, when set. Such info isn't cached.
         **kw:
             Keyword arguments passed to `ls`
 
@@ -253,51 +1143,64 @@ class V3ioFS(AbstractFileSystem):
             directory, or something else) and other FS-specific keys.
         """
         path_with_container = strip_schema(path)
+        attributes = kw.get("attributes")
+        if attributes:
+            # Not in the cache nor the indexes
+            entry = self._file_info(path_with_container, attributes)
+            if entry is not None:
+                return entry
+            return self._dir_info(path_with_container)
+
+        index = self._index_of(path_with_container)
+        if index is not None:
+            return index.info("/" + unslash(path_with_container))
 
         if self._cache:
             with self._cache_lock:
-                lookup_result = self._cache.get(path_with_container)
+                lookup_result, stale = self._cache.get_stale(path_with_container)
             if lookup_result:
+                if stale:
+                    self._revalidate(path_with_container, partial(self._refresh_info, path_with_container))
                 return lookup_result
 
-        container, path_without_container = split_container(path_with_container)
-
         # First, we try to get the file's attributes, which will fail with a 404 if it's actually a directory.
-        resp = self._client.get_item(
-            container,
-            path_without_container,
-            attribute_names=["__size", "__mtime_secs", "__mtime_nsecs", "__mode", "__gid", "__uid"],
-            raise_for_status=v3io.dataplane.RaiseForStatus.never,
-        )
-
-        if resp.status_code == 200:
-            mtime = int(resp.output.item["__mtime_secs"]) + int(resp.output.item["__mtime_nsecs"]) / 10**9
-            entry = {
-                "name": path_with_container,
-                "type": "file",
-                "size": resp.output.item["__size"],
-                "mtime": mtime,
-                "mode": resp.output.item["__mode"],
-                "gid": resp.output.item["__gid"],
-                "uid": resp.output.item["__uid"],
-            }
-            if self._cache:
-                with self._cache_lock:
-                    self._cache.put(path_with_container, entry)
+        entry = self._file_info(path_with_container)
+        if entry is not None:
             return entry
-        elif resp.status_code == 404:
-            pass  # The file may still be a directory.
-        else:
-            raise Exception(
-                f"{resp.status_code} received while getting the attributes of {path_with_container!r}. "
-                f"body={resp.body}, headers={resp.headers}"
-            )
+        return self._dir_info(path_with_container)
+
+    def _refresh_info(self, path_with_container):
+        if self._file_info(path_with_container) is None:
+            self._dir_info(path_with_container)
+
+    def _revalidate(self, key, refresh):
+        """Run refresh, which puts a fresh value for key in the cache, in the background"""
+        with self._cache_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._refresher.submit(self._refresh, key, refresh)
+
+    def _refresh(self, key, refresh):
+        try:
+            refresh()
+        except Exception:
+            # Deleted or failing, let the next lookup fetch it (and raise)
+            with self._cache_lock:
+                self._cache.delete_if_exists(key)
+        finally:
+            with self._cache_lock:
+                self._refreshing.discard(key)
+
+    def _dir_info(self, path_with_container):
+        container, path_without_container = split_container(path_with_container)
 
         # Check the existence of a directory at the provided path.
-        resp = self._client.get_container_contents(
+        resp = self._idempotent(
+            "get_container_contents",
             container=container,
             path=path_without_container,
-            raise_for_status=v3io.dataplane.RaiseForStatus.never,
+            raise_for_status=RaiseForStatus.never,
             limit=0,
         )
 
@@ -312,6 +1215,49 @@ class V3ioFS(AbstractFileSystem):
         else:
             raise Exception(f"{resp.status_code} received while listing {path_with_container!r}")
 
+    def _file_info(self, path_with_container, attributes=None):
+        """Info of the file at path, from a single get_item. None if there's no such file.
+
+        The user attributes in attributes are added to the info when set, such info isn't cached.
+        """
+        attributes = list(attributes or [])
+        container, path_without_container = split_container(path_with_container)
+        start = time.monotonic()
+        resp = self._idempotent(
+            "get_item",
+            container,
+            path_without_container,
+            attribute_names=["__size", "__mtime_secs", "__mtime_nsecs", "__mode", "__gid", "__uid"] + attributes,
+            raise_for_status=RaiseForStatus.never,
+        )
+        self._transferred("read", 0, start)
+
+        if resp.status_code == 404:
+            return None  # The path may still be a directory.
+        if resp.status_code != 200:
+            raise Exception(
+                f"{resp.status_code} received while getting the attributes of {path_with_container!r}. "
+                f"body={resp.body}, headers={resp.headers}"
+            )
+
+        mtime = int(resp.output.item["__mtime_secs"]) + int(resp.output.item["__mtime_nsecs"]) / 10**9
+        entry = {
+            "name": path_with_container,
+            "type": "file",
+            "size": resp.output.item["__size"],
+            "mtime": mtime,
+            "mode": resp.output.item["__mode"],
+            "gid": resp.output.item["__gid"],
+            "uid": resp.output.item["__uid"],
+        }
+        if attributes:
+            entry.update((name, resp.output.item[name]) for name in attributes if name in resp.output.item)
+            return entry
+        if self._cache:
+            with self._cache_lock:
+                self._cache.put(path_with_container, entry)
+        return entry
+
     # Override to print the otherwise silenced exception.
     def isdir(self, path):
         """Is this entry directory-like?"""
@@ -332,6 +1278,87 @@ class V3ioFS(AbstractFileSystem):
             traceback.print_exc()
             return False
 
+    def read_block(self, fn, offset, length, delimiter=None):
+        """Read a block of bytes from a file
+
+        Same as ``fsspec.AbstractFileSystem.read_block``: with a delimiter the block starts after the first
+        delimiter at or after offset (or at 0), and ends after the first delimiter at or after offset + length.
+        The block and the following 64KiB are read in a single request, the delimiters are looked for locally, and
+        more is read only for records that don't fit in that.
+
+        Parameters
+        ----------
+        fn: str
+            Path of the file
+        offset: int
+            Byte offset to start the read at
+        length: int | None
+            Number of bytes to read, read to the end of the file if None
+        delimiter: bytes | None
+            Make the block start and stop at delimiters
+        """
+        path = "/" + unslash(self._strip_protocol(fn))
+        size = self.info(path)["size"]
+        if length is None:
+            length = size
+        length = min(length, size - offset)
+        if not delimiter:
+            return self._read_range(path, offset, offset + length)
+
+        buf_start = offset
+        buf = bytearray(self._read_range(path, offset, min(size, offset + length + _block_overlap)))
+
+        def after_delimiter(pos):
+            """Position after the first delimiter at or after pos, or size"""
+            nonlocal buf
+            if pos == 0:
+                return 0
+            while True:
+                i = buf.find(delimiter, pos - buf_start)
+                if i >= 0:
+                    return buf_start + i + len(delimiter)
+                buf_end = buf_start + len(buf)
+                if buf_end >= size:
+                    return size
+                # A long record, double what's read
+                buf += self._read_range(path, buf_end, min(size, buf_end + max(len(buf), _block_overlap)))
+
+        start = after_delimiter(offset)
+        end = after_delimiter(offset + length)
+        start, end = start - buf_start, end - buf_start
+        return bytes(buf[start:end])
+
+    def _read_range(self, path, start, end):
+        """Bytes [start, end) of the object at path, in a single request"""
+        if start >= end:
+            return b""
+        container, path_without_container = split_container(path)
+        started = time.monotonic()
+        resp = self._idempotent(
+            "get_object",
+            container,
+            path_without_container,
+            offset=start,
+            num_bytes=end - start,
+            raise_for_status=RaiseForStatus.never,
+        )
+        data = handle_v3io_errors(resp, path)
+        self._transferred("read", len(data), started)
+        return data
+
+    def cat_file(self, path, start=None, end=None, **kw):
+        """Get the content of a file
+
+        An unbounded read fetches the whole object in a single request, without probing its size first.
+        """
+        if start is not None or end is not None:
+            return super().cat_file(path, start=start, end=end, **kw)
+
+        path = strip_schema(path)
+        container, path_without_container = split_container(path)
+        resp = self._client.get_object(container, path_without_container, raise_for_status=RaiseForStatus.never)
+        return handle_v3io_errors(resp, path)
+
     def _open(
         self,
         path,
@@ -343,7 +1370,11 @@ class V3ioFS(AbstractFileSystem):
         **kw,
     ):
         if mode != "rb":
-            self._cache.delete_if_exists(path)
+            self.invalidate_cache(path)
+        elif kw.get("size") is None and kw.get("info") is None and not kw.get("codec"):
+            kw.update(self._small_object(path))
+        if block_size is None and self._tuner is not None:
+            block_size = self._tuner.block_size(path, mode)
         return V3ioFile(
             fs=self,
             path=path,
@@ -355,6 +1386,158 @@ class V3ioFS(AbstractFileSystem):
             **kw,
         )
 
+    def appender(self, flush_size=None, flush_interval=None, max_workers=None):
+        """Appender that batches appends from many threads into one request per path
+
+        Parameters
+        ----------
+        flush_size: int | None
+            Send the writes buffered for a path once they reach this many bytes. Default is 1MiB.
+        flush_interval: float | None
+            Send the writes buffered for a path once the oldest is this many seconds old. Default is 1.
+        max_workers: int | None
+            Number of concurrent appends (to different paths). Default is 8.
+
+        Returns
+        -------
+        Appender
+            Use ``write(path, data)``, ``flush()`` and ``close()``, or use it as a context manager
+        """
+        if flush_size is None:
+            flush_size = 2**20
+        if flush_interval is None:
+            flush_interval = 1
+        return Appender(self, int(flush_size), float(flush_interval), max_workers or _max_workers)
+
+    def prefetch(self, paths, data=False, ranges=None, max_workers=None):
+        """Look up the info of paths, and read their data, in the background
+
+        Fills the info cache and, with data or ranges, the block cache (see block_cache_size), so the following
+        info(), ls() and reads of paths are served from memory.
+
+        Parameters
+        ----------
+        paths: str | list of str
+            Paths to prefetch
+        data: bool
+            Also read the files. Default is False (only their info).
+        ranges: list of (int | None, int | None) | None
+            (start, end) of the data to read from each file, negative offsets are from its end and None is its
+            start or end. [(-65536, None)] reads the last 64KiB of each file. Implies data. Default is the whole
+            files.
+        max_workers: int | None
+            Number of paths prefetched concurrently. Default is 8.
+
+        Returns
+        -------
+        Prefetch
+            Handle to wait() for or cancel() the prefetch
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        data = data or ranges is not None
+        if data and self._blocks is None:
+            raise ValueError("prefetching data needs a block cache (block_cache_size)")
+        ranges = [(0, None)] if ranges is None else list(ranges)
+        return Prefetch(self, list(paths), data, ranges, _transfer_chunk_size, max_workers or _max_workers)
+
+    def read_footers(self, paths, max_workers=None):
+        """Read the footers of paths concurrently, keeping them for the following reads
+
+        Parameters
+        ----------
+        paths: list of str
+            Files to read the footers of
+        max_workers: int | None
+            Number of concurrent reads. Default is 8.
+
+        Returns
+        -------
+        dict
+            path -> the last footer_size bytes of the file (or all of it, if it's smaller)
+        """
+        if self._footers is None:
+            raise ValueError("footer cache is disabled (footer_size is not set)")
+
+        def read(path):
+            info = self.info(path)
+            if not info["size"]:
+                return b""
+            return self._footer(path, info["size"], info["mtime"])[1]
+
+        with ThreadPoolExecutor(max_workers or _max_workers) as pool:
+            return dict(zip(paths, pool.map(read, paths)))
+
+    def _footer(self, path, size, mtime):
+        """(offset, data) of the last footer_size bytes of path, from the footer cache if it's there"""
+        path = "/" + unslash(strip_schema(path))
+        # Without an mtime there's no telling whether a cached footer is still valid
+        entry = None if mtime is None else self._footers.get(path, size, mtime)
+        if entry is not None:
+            return entry
+
+        offset = max(0, size - self._footer_size)
+        data = self._read_range(path, offset, size)
+        if mtime is not None:
+            self._footers.put(path, size, mtime, offset, data)
+        return offset, data
+
+    def _small_object(self, path):
+        """Read the start of an object without looking up its info first, so opening it takes a single request
+
+        Returns keyword arguments for V3ioFile: ``data`` and ``size`` if the whole object was read, ``head`` with
+        its first small_object_size bytes otherwise (and ``size``, when the response has it). If the info of the
+        object is cached it's used instead, and with a block cache small objects are read from it and kept in it.
+        Such info has an mtime, so the file can tell whether it changed since (see V3ioFile.revalidate).
+        """
+        if not self._small_object_size:
+            return {}
+
+        path = strip_schema(path)
+        if self._cache:
+            with self._cache_lock:
+                info = self._cache.get(path)
+            if info is not None:
+                if not self._blocks_small_object(info):
+                    return {}
+                return {"info": info, "data": self._small_object_blocks(path, info, partial(self._read_range, path))}
+
+        container, path_without_container = split_container(path)
+        resp = self._idempotent(
+            "get_object",
+            container,
+            path_without_container,
+            num_bytes=self._small_object_size,
+            raise_for_status=RaiseForStatus.never,
+        )
+        if resp.status_code == 404:
+            raise FileNotFoundError(path)
+        # Directories etc. are left to the regular path
+        if resp.status_code not in {200, 206}:
+            return {}
+
+        if len(resp.body) < self._small_object_size:
+            return {"data": resp.body, "size": len(resp.body)}
+        size = _range_size(resp)
+        if size is None:
+            return {"head": resp.body}
+        if size == len(resp.body):
+            return {"data": resp.body, "size": size}
+        return {"head": resp.body, "size": size}
+
+    def _blocks_small_object(self, info):
+        """Whether the object of info is a small object kept in the block cache"""
+        return (
+            self._blocks is not None
+            and info["type"] == "file"
+            and info["size"] < self._small_object_size
+            and info.get("mtime") is not None
+        )
+
+    def _small_object_blocks(self, path, info, fetcher):
+        """The whole small object at path from the block cache, fetcher(start, end) reads what's missing"""
+        return self._cached_range(path, info["size"], info["mtime"], 0, info["size"], fetcher)
+
 
 def container_path(container):
     return f"/{container.name}"
@@ -456,7 +1639,48 @@ def _has_data(resp):
     return hasattr(out, "common_prefixes") or hasattr(out, "contents")
 
 
-def _new_client(v3io_api=None, v3io_access_key=None, debug=False) -> Client:
+def _range_size(resp):
+    """Object size from the Content-Range header of a ranged get_object response, None if it's not there
+
+    >>> from types import SimpleNamespace
+    >>> _range_size(SimpleNamespace(headers={"Content-Range": "bytes 0-99/1234"}))
+    1234
+    >>> _range_size(SimpleNamespace(headers={})) is None
+    True
+    """
+    total = (resp.headers or {}).get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def _block_key(path):
+    """Path of an object in the block cache"""
+    return "/" + unslash(strip_schema(path))
+
+
+def _ls_key(path, detail):
+    """Cache key of the listing of path
+
+    >>> _ls_key("/bigdata/", True) == _ls_key("bigdata", True)
+    True
+    """
+    return f"ls:{int(detail)}:/{unslash(path)}"
+
+
+def _list_local(root):
+    """Map path relative to root -> (size, mtime) of all files under local directory root"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            files[os.path.relpath(path, root).replace(os.sep, "/")] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def _new_client(v3io_api=None, v3io_access_key=None, debug=False) -> "Client":
+    # Imported here, the v3io client is slow to import and is only needed once a V3ioFS is created
+    from v3io.dataplane import Client
+
     v3io_api = v3io_api or environ.get("V3IO_API")
     v3io_access_key = v3io_access_key or environ.get("V3IO_ACCESS_KEY")
 
@@ -465,8 +1689,26 @@ def _new_client(v3io_api=None, v3io_access_key=None, debug=False) -> Client:
         client_kwargs["logger_verbosity"] = "DEBUG"
         client_kwargs["transport_verbosity"] = "DEBUG"
 
-    return Client(
-        endpoint=v3io_api,
-        access_key=v3io_access_key,
-        **client_kwargs,
-    )
+    endpoints = _endpoints(v3io_api)
+    clients = [
+        (endpoint, Client(endpoint=endpoint, access_key=v3io_access_key, **client_kwargs)) for endpoint in endpoints
+    ]
+    if len(clients) > 1:
+        return _BalancedClient(clients)
+    return clients[0][1]
+
+
+def _endpoints(v3io_api):
+    """
+    >>> _endpoints("http://node1:8081, http://node2:8081")
+    ['http://node1:8081', 'http://node2:8081']
+    >>> _endpoints(["node1", "node2"])
+    ['node1', 'node2']
+    >>> _endpoints(None)
+    [None]
+    """
+    if not v3io_api:
+        return [None]
+    if isinstance(v3io_api, str):
+        v3io_api = v3io_api.split(",")
+    return [endpoint.strip() for endpoint in v3io_api if endpoint.strip()]
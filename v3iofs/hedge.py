@@ -0,0 +1,119 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Hedged requests: a request that's slower than usual is sent again, and the first response is used"""
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import BoundedSemaphore, Lock
+
+# Latencies kept per operation, and the number needed before hedging
+_window = 200
+_min_samples = 20
+# Hedges that can be saved up while there's nothing to hedge, also the most duplicates in flight
+_max_tokens = 10
+# Requests that can be hedged in flight
+_max_workers = 64
+
+
+class _Hedger:
+    """Sends idempotent requests, duplicating the ones slower than a percentile of the recent latencies of the
+    same operation
+
+    Every request adds budget to a token bucket and every duplicate takes a whole token, so at most about
+    budget duplicates are sent per request, and at most _max_tokens at a time. A request that can be hedged
+    runs on a pool of _max_workers threads when one of them is free. Otherwise it runs on the calling thread
+    and isn't hedged, so time spent waiting for a worker never counts as latency. Duplicates run on a pool of
+    _max_tokens threads.
+
+    Parameters
+    ----------
+    percentile: float
+        Duplicate requests slower than this percentile (0-100) of the recent latencies
+    budget: float
+        Fraction of extra requests allowed
+    """
+
+    def __init__(self, percentile, budget):
+        self._percentile = percentile
+        self._budget = budget
+        self._latencies = {}
+        self._tokens = 1.0
+        self._lock = Lock()
+        # Free workers of _pool
+        self._slots = BoundedSemaphore(_max_workers)
+        self._pool = ThreadPoolExecutor(_max_workers, thread_name_prefix="v3iofs-hedge")
+        self._hedges = ThreadPoolExecutor(_max_tokens, thread_name_prefix="v3iofs-hedge-dup")
+        self._hedges_in_flight = 0
+        self.hedged = 0
+
+    def call(self, op, method, *args, **kw):
+        threshold = self._threshold(op)
+        if threshold is None or self._tokens < 1 or not self._slots.acquire(blocking=False):
+            return self._timed(op, method, args, kw)
+
+        primary = self._pool.submit(self._run, op, method, args, kw)
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._take_token():
+            return primary.result()
+
+        hedge = self._hedges.submit(self._run_hedge, method, args, kw)
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        # The first response is an error, use the other one
+        return (hedge if primary in done else primary).result()
+
+    def _run(self, op, method, args, kw):
+        try:
+            return self._timed(op, method, args, kw)
+        finally:
+            self._slots.release()
+
+    def _run_hedge(self, method, args, kw):
+        try:
+            return method(*args, **kw)
+        finally:
+            with self._lock:
+                self._hedges_in_flight -= 1
+
+    def _timed(self, op, method, args, kw):
+        start = time.monotonic()
+        try:
+            return method(*args, **kw)
+        finally:
+            latency = time.monotonic() - start
+            with self._lock:
+                latencies = self._latencies.get(op)
+                if latencies is None:
+                    latencies = self._latencies[op] = deque(maxlen=_window)
+                latencies.append(latency)
+                self._tokens = min(self._tokens + self._budget, _max_tokens)
+
+    def _threshold(self, op):
+        with self._lock:
+            latencies = self._latencies.get(op)
+            if latencies is None or len(latencies) < _min_samples:
+                return None
+            latencies = sorted(latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self._percentile / 100))]
+
+    def _take_token(self):
+        with self._lock:
+            if self._tokens < 1 or self._hedges_in_flight >= _max_tokens:
+                return False
+            self._tokens -= 1
+            self._hedges_in_flight += 1
+            self.hedged += 1
+            return True
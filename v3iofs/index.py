@@ -0,0 +1,86 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Indexes of directory trees
+
+An index is a gzipped JSON manifest of all the directories and files under a root directory, stored next to the
+root (as ``.<root name>.v3iofs_index`` in its parent). It also records the mtime of the root, so an index that's
+older than the last change to the root directory is not used.
+"""
+import gzip
+import json
+
+_version = 1
+
+
+def index_path(root):
+    """
+    >>> index_path("/bigdata/datasets/sales")
+    '/bigdata/datasets/.sales.v3iofs_index'
+    """
+    parent, _, name = root.rpartition("/")
+    return f"{parent}/.{name}.v3iofs_index"
+
+
+def encode_index(root, mtime, entries):
+    """Manifest of root from its ls entries (with detail)"""
+    start = len(root) + 1
+    dirs, files = [], []
+    for entry in entries:
+        name = entry["name"][start:]
+        if entry["type"] == "directory":
+            dirs.append([name, entry.get("mtime")])
+        else:
+            files.append([name, entry["size"], entry.get("mtime"), entry.get("mode")])
+    manifest = {"version": _version, "root": root, "mtime": mtime, "dirs": dirs, "files": files}
+    return gzip.compress(json.dumps(manifest, separators=(",", ":")).encode())
+
+
+class _Index:
+    """ls and info of the entries of a manifest"""
+
+    def __init__(self, data):
+        manifest = json.loads(gzip.decompress(data))
+        if manifest["version"] != _version:
+            raise ValueError(f"unknown index version: {manifest['version']!r}")
+        self.root = root = manifest["root"]
+        self.mtime = manifest["mtime"]
+
+        self._entries = {root: {"name": root, "type": "directory", "size": 0}}
+        for name, mtime in manifest["dirs"]:
+            path = f"{root}/{name}"
+            self._entries[path] = {"name": path, "type": "directory", "size": 0, "mtime": mtime}
+        for name, size, mtime, mode in manifest["files"]:
+            path = f"{root}/{name}"
+            self._entries[path] = {"name": path, "type": "file", "size": size, "mtime": mtime}
+            if mode is not None:
+                self._entries[path]["mode"] = mode
+
+        self._children = {path: [] for path, entry in self._entries.items() if entry["type"] == "directory"}
+        for path in sorted(self._entries):
+            if path != root:
+                self._children[path.rpartition("/")[0]].append(path)
+
+    def info(self, path):
+        entry = self._entries.get(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return dict(entry)
+
+    def ls(self, path, detail):
+        entry = self.info(path)
+        if entry["type"] == "file":
+            return [entry] if detail else [path]
+        if not detail:
+            return list(self._children[path])
+        return [dict(self._entries[child]) for child in self._children[path]]
@@ -0,0 +1,270 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Memory shared by the files of a V3ioFS: a budget for their read caches and write buffers, and a block cache"""
+from collections import OrderedDict
+from threading import Lock
+
+from fsspec.caching import BaseCache
+
+# A buffer that's not the largest is flushed early only from this fraction of the limit, smaller appends aren't
+# worth a request
+_min_flush_fraction = 16
+
+
+class _MemoryBudget:
+    """Keeps read blocks in a single LRU and tracks the write buffers of all files
+
+    Read blocks are dropped, least recently used first, when blocks and write buffers together are over limit.
+    When dropping all the read blocks isn't enough, the largest buffer is flushed. A file can only flush its own
+    buffer, so the file whose buffer grew flushes it if it's the largest (or not too small), otherwise the file
+    with the largest buffer is told to flush it on its next write. Files are identified by owner, an id that's
+    unique while the file is open.
+    """
+
+    def __init__(self, limit):
+        self._limit = limit
+        self._lock = Lock()
+        self._blocks = OrderedDict()
+        self._owned = {}
+        self._buffered = {}
+        # Owners asked to flush on their next write
+        self._flush_requested = set()
+        self._used = 0
+        self._peak = 0
+        self._evictions = 0
+        self._early_flushes = 0
+
+    def get(self, owner, block):
+        with self._lock:
+            data = self._blocks.get((owner, block))
+            if data is not None:
+                self._blocks.move_to_end((owner, block))
+            return data
+
+    def put(self, owner, block, data):
+        with self._lock:
+            old = self._blocks.pop((owner, block), None)
+            if old is not None:
+                self._used -= len(old)
+            self._blocks[(owner, block)] = data
+            self._owned.setdefault(owner, set()).add(block)
+            self._add(len(data))
+            self._evict()
+
+    def buffered(self, owner, size):
+        """Set the size of the write buffer of owner, True if owner should flush it to stay within the limit"""
+        with self._lock:
+            self._add(size - self._buffered.get(owner, 0))
+            self._buffered[owner] = size
+            self._evict()
+            requested = owner in self._flush_requested
+            self._flush_requested.discard(owner)
+            if self._used <= self._limit or size == 0:
+                return False
+
+            largest = max(self._buffered, key=self._buffered.get)
+            if requested or largest == owner or size >= self._limit // _min_flush_fraction:
+                self._early_flushes += 1
+                return True
+            self._flush_requested.add(largest)
+            return False
+
+    def release(self, owner):
+        """Drop the blocks and buffer of a closed file"""
+        with self._lock:
+            for block in self._owned.pop(owner, ()):
+                self._used -= len(self._blocks.pop((owner, block)))
+            self._used -= self._buffered.pop(owner, 0)
+            self._flush_requested.discard(owner)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": self._limit,
+                "used": self._used,
+                "peak": self._peak,
+                "read_blocks": len(self._blocks),
+                "write_buffers": sum(self._buffered.values()),
+                "evictions": self._evictions,
+                "early_flushes": self._early_flushes,
+            }
+
+    def _add(self, size):
+        self._used += size
+        self._peak = max(self._peak, self._used)
+
+    def _evict(self):
+        while self._used > self._limit and self._blocks:
+            (owner, block), data = self._blocks.popitem(last=False)
+            self._owned[owner].discard(block)
+            self._used -= len(data)
+            self._evictions += 1
+
+
+class _BudgetCache(BaseCache):
+    """Block cache whose blocks are kept in a _MemoryBudget
+
+    Consecutive missing blocks are fetched in a single request.
+    """
+
+    name = "v3iofs-budget"
+
+    def __init__(self, blocksize, fetcher, size, budget, owner):
+        super().__init__(blocksize, fetcher, size)
+        self._budget = budget
+        self._owner = owner
+
+    def _fetch(self, start, end):
+        if start is None:
+            start = 0
+        if end is None:
+            end = self.size
+        if start >= self.size or start >= end:
+            return b""
+        end = min(end, self.size)
+
+        first, last = start // self.blocksize, (end - 1) // self.blocksize
+        blocks, missing = [], []
+        for block in range(first, last + 1):
+            data = self._budget.get(self._owner, block)
+            blocks.append(data)
+            if data is None:
+                missing.append(block)
+        for run_start, run_end in _runs(missing):
+            offset = run_start * self.blocksize
+            data = self.fetcher(offset, min(run_end * self.blocksize, self.size))
+            for block in range(run_start, run_end):
+                block_start = (block - run_start) * self.blocksize
+                block_end = block_start + self.blocksize
+                block_data = data[block_start:block_end]
+                self._budget.put(self._owner, block, block_data)
+                blocks[block - first] = block_data
+
+        out = b"".join(blocks)
+        start, end = start - first * self.blocksize, end - first * self.blocksize
+        return out[start:end]
+
+
+def _runs(blocks):
+    """(start, end) of the runs of consecutive numbers in sorted blocks
+
+    >>> list(_runs([1, 2, 3, 5, 7, 8]))
+    [(1, 4), (5, 6), (7, 9)]
+    """
+    run_start = None
+    for i, block in enumerate(blocks):
+        if run_start is None:
+            run_start = block
+        if i + 1 == len(blocks) or blocks[i + 1] != block + 1:
+            yield run_start, block + 1
+            run_start = None
+
+
+class _BlockCache:
+    """LRU of fixed size blocks of objects, shared by the file handles of a V3ioFS
+
+    Blocks are keyed by (path, mtime, block index), so a changed object isn't read from blocks of its previous
+    version. Consecutive missing blocks are fetched in a single request.
+    """
+
+    def __init__(self, capacity, block_size):
+        self._capacity = capacity
+        self._block_size = block_size
+        self._lock = Lock()
+        self._blocks = OrderedDict()
+        # path -> keys of its blocks
+        self._keys = {}
+        self._used = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def read(self, path, mtime, size, start, end, fetcher):
+        """Bytes [start, end) of the object at path, of size bytes, fetching missing blocks with fetcher(start, end)"""
+        end = min(end, size)
+        if start >= end:
+            return b""
+
+        first, last = start // self._block_size, (end - 1) // self._block_size
+        blocks, missing = [], []
+        with self._lock:
+            for block in range(first, last + 1):
+                data = self._blocks.get((path, mtime, block))
+                if data is None:
+                    missing.append(block)
+                else:
+                    self._blocks.move_to_end((path, mtime, block))
+                blocks.append(data)
+            self._hits += len(blocks) - len(missing)
+            self._misses += len(missing)
+
+        for run_start, run_end in _runs(missing):
+            data = fetcher(run_start * self._block_size, min(run_end * self._block_size, size))
+            for block in range(run_start, run_end):
+                block_start = (block - run_start) * self._block_size
+                block_end = block_start + self._block_size
+                blocks[block - first] = block_data = data[block_start:block_end]
+                self._put((path, mtime, block), block_data)
+
+        out = b"".join(blocks)
+        start, end = start - first * self._block_size, end - first * self._block_size
+        return out[start:end]
+
+    def drop(self, path=None):
+        """Drop the blocks of path, or all the blocks if path is None"""
+        with self._lock:
+            if path is None:
+                self._blocks.clear()
+                self._keys.clear()
+                self._used = 0
+                return
+        self.drop_many([path])
+
+    def drop_many(self, paths):
+        """Drop the blocks of all of paths"""
+        with self._lock:
+            for path in paths:
+                for key in self._keys.pop(path, ()):
+                    self._used -= len(self._blocks.pop(key))
+
+    def stats(self):
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "capacity": self._capacity,
+                "used": self._used,
+                "blocks": len(self._blocks),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "evictions": self._evictions,
+            }
+
+    def _put(self, key, data):
+        if len(data) > self._capacity:
+            return
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self._used -= len(old)
+            self._blocks[key] = data
+            self._keys.setdefault(key[0], set()).add(key)
+            self._used += len(data)
+            while self._used > self._capacity:
+                evicted, data = self._blocks.popitem(last=False)
+                self._keys[evicted[0]].discard(evicted)
+                if not self._keys[evicted[0]]:
+                    del self._keys[evicted[0]]
+                self._used -= len(data)
+                self._evictions += 1
@@ -11,7 +11,6 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import re
 from urllib.parse import urlparse
 
 
@@ -48,13 +47,3 @@ def split_container(path):
 def unslash(s):
     """Remove optional slashes from the start/end."""
     return s.strip("/")
-
-
-def _norm(p):
-    p = re.sub("/+", "/", p)
-    return "/" + p if p[0] != "/" else p
-
-
-def path_equal(p1, p2):
-    """Check that two paths are equal"""
-    return _norm(p1) == _norm(p2)
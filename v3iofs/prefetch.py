@@ -0,0 +1,113 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+from functools import partial
+
+
+class Prefetch:
+    """Info and data of files being read in the background, ahead of their use
+
+    Each path gets its info looked up (filling the info cache) and then, if asked to, the ranges of its data
+    read into the block cache, in chunks. Errors don't propagate, wait() returns them.
+
+    Create with V3ioFS.prefetch().
+
+    Parameters
+    ----------
+    fs: V3ioFS
+        File system whose caches are filled
+    paths: list of str
+        Paths to prefetch
+    data: bool
+        Also read data, not just info
+    ranges: list of (int | None, int | None)
+        (start, end) of the data to read from each file, negative offsets are from the end of the file and None
+        is its start or end
+    chunk_size: int
+        Bytes read per request
+    max_workers: int
+        Number of paths prefetched concurrently
+    """
+
+    def __init__(self, fs, paths, data, ranges, chunk_size, max_workers):
+        self._fs = fs
+        self._data = data
+        self._ranges = ranges
+        self._chunk_size = chunk_size
+        self._cancelled = False
+        pool = ThreadPoolExecutor(max_workers, thread_name_prefix="v3iofs-prefetch")
+        self._futures = {path: pool.submit(self._prefetch, path) for path in paths}
+        # Workers exit once the paths are done
+        pool.shutdown(wait=False)
+
+    def done(self):
+        """True once all the paths are prefetched, failed or cancelled"""
+        return all(future.done() for future in self._futures.values())
+
+    def wait(self, timeout=None):
+        """Wait for the paths to be prefetched
+
+        Returns
+        -------
+        dict
+            path -> exception, for the paths that failed
+
+        Raises
+        ------
+        TimeoutError
+            If some paths are still being prefetched after timeout seconds
+        """
+        _, not_done = wait(self._futures.values(), timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} of {len(self._futures)} paths not prefetched")
+        return {
+            path: future.exception()
+            for path, future in self._futures.items()
+            if not future.cancelled() and future.exception() is not None
+        }
+
+    def cancel(self):
+        """Stop prefetching, paths that are being prefetched stop after their current request"""
+        self._cancelled = True
+        for future in self._futures.values():
+            future.cancel()
+
+    def _prefetch(self, path):
+        info = self._fs.info(path)
+        if not self._data or info["type"] != "file" or info.get("mtime") is None:
+            return
+
+        path, size = info["name"], info["size"]
+        fetcher = partial(self._fs._read_range, path)
+        for start, end in _resolve(self._ranges, size):
+            for chunk_start in range(start, end, self._chunk_size):
+                if self._cancelled:
+                    return
+                chunk_end = min(chunk_start + self._chunk_size, end)
+                self._fs._cached_range(path, size, info["mtime"], chunk_start, chunk_end, fetcher)
+
+
+def _resolve(ranges, size):
+    """(start, end) offsets of ranges in a file of size bytes
+
+    >>> list(_resolve([(0, None), (-10, None), (5, -5), (None, 200)], 100))
+    [(0, 100), (90, 100), (5, 95), (0, 100)]
+    """
+    for start, end in ranges:
+        start, end = start or 0, size if end is None else end
+        if start < 0:
+            start = max(size + start, 0)
+        if end < 0:
+            end = size + end
+        yield start, min(end, size)
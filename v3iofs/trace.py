@@ -0,0 +1,240 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Record the v3io requests of a V3ioFS and replay them
+
+Record by creating the file system with ``V3ioFS(trace_path="trace.jsonl")``. Every request is a JSON line with
+its start time (seconds from the start of the trace), operation, container, path, arguments (offset, number of
+bytes, marker etc.), body size, response status, latency and thread.
+
+Replay with::
+
+    python -m v3iofs.trace trace.jsonl [--speed 2] [--concurrency 16] [--writes]
+
+which issues the recorded requests against V3IO_API (or --v3io-api) and prints the latency percentiles of the
+trace and of the replay, per operation. Only reads are replayed, unless --writes is given.
+"""
+import json
+import time
+import traceback
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, get_ident
+
+from .utils import RaiseForStatus
+
+# Arguments kept in the trace, other than container, path and body
+_traced_args = [
+    "offset",
+    "num_bytes",
+    "append",
+    "attribute_names",
+    "attributes",
+    "get_all_attributes",
+    "limit",
+    "marker",
+]
+_write_ops = {"put_object", "update_item", "put_item", "delete_object"}
+
+
+class _TracingClient:
+    """Wraps a v3io client, recording every request to a trace file"""
+
+    def __init__(self, client, path):
+        self._client = client
+        self._out = open(path, "a")
+        self._lock = Lock()
+        self._start = time.monotonic()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kw):
+            return self._call(name, attr, args, kw)
+
+        return call
+
+    def close(self):
+        with self._lock:
+            self._out.close()
+        self._client.close()
+
+    def _call(self, op, method, args, kw):
+        record = {"t": round(time.monotonic() - self._start, 6), "op": op}
+        for i, name in enumerate(["container", "path"]):
+            if len(args) > i:
+                record[name] = args[i]
+            elif name in kw:
+                record[name] = kw[name]
+        traced = {name: kw[name] for name in _traced_args if kw.get(name) is not None}
+        if isinstance(traced.get("attributes"), dict):
+            # Only the names, values can be bytes and are of no use for replay
+            traced["attributes"] = sorted(traced["attributes"])
+        if traced:
+            record["kw"] = traced
+        if kw.get("body") is not None:
+            record["length"] = len(kw["body"])
+
+        start = time.monotonic()
+        try:
+            resp = method(*args, **kw)
+        except Exception as err:
+            record["error"] = repr(err)
+            raise
+        else:
+            record["status"] = resp.status_code
+            if op == "get_object":
+                record["length"] = len(resp.body)
+            return resp
+        finally:
+            record["latency"] = round(time.monotonic() - start, 6)
+            record["thread"] = get_ident()
+            self._write(record)
+
+    def _write(self, record):
+        """Add record to the trace, tracing errors are printed and never reach the traced request"""
+        try:
+            line = json.dumps(record, separators=(",", ":"), default=repr)
+            with self._lock:
+                if not self._out.closed:
+                    self._out.write(line + "\n")
+        except Exception:
+            traceback.print_exc()
+
+
+def read_trace(path):
+    """Records of a trace file, by start time"""
+    with open(path) as fp:
+        records = [json.loads(line) for line in fp if line.strip()]
+    return sorted(records, key=lambda record: record["t"])
+
+
+def replay(fs, records, concurrency=None, speed=1.0, writes=False):
+    """Issue the requests of a trace through the client of fs
+
+    Parameters
+    ----------
+    fs: V3ioFS
+        File system whose client issues the requests
+    records: list of dict
+        Records from read_trace
+    concurrency: int | None
+        Number of concurrent requests. Default is the number of threads in the trace.
+    speed: float
+        Scale the time between requests, 2 issues them twice as fast as recorded. 0 issues them as fast as
+        possible. Default is 1.
+    writes: bool
+        Also replay writes (with bodies of the recorded size). Default is False.
+
+    Returns
+    -------
+    list of dict
+        Per replayed request: op, status (or error) and latency
+    """
+    if not writes:
+        records = [record for record in records if record["op"] not in _write_ops]
+    if not records:
+        return []
+    if concurrency is None:
+        concurrency = len({record.get("thread") for record in records})
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = []
+        for record in records:
+            if speed:
+                delay = start + record["t"] / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(_issue, fs._client, record))
+        return [future.result() for future in futures]
+
+
+def _issue(client, record):
+    args = [record[name] for name in ["container", "path"] if name in record]
+    kw = dict(record.get("kw", {}))
+    if record["op"] == "put_object":
+        kw["body"] = bytes(record.get("length", 0))
+    if isinstance(kw.get("attributes"), list):
+        # The trace has the attribute names only
+        kw["attributes"] = {name: "" for name in kw["attributes"]}
+    result = {"op": record["op"]}
+    start = time.monotonic()
+    try:
+        resp = getattr(client, record["op"])(*args, raise_for_status=RaiseForStatus.never, **kw)
+    except Exception as err:
+        result["error"] = repr(err)
+    else:
+        result["status"] = resp.status_code
+    result["latency"] = time.monotonic() - start
+    return result
+
+
+def summarize(records):
+    """Map op -> count, errors and latency percentiles (in seconds) of trace or replay records
+
+    >>> summary = summarize([{"op": "get_item", "status": 200, "latency": i / 100} for i in range(1, 101)])
+    >>> summary["get_item"]["count"], summary["get_item"]["p50"], summary["get_item"]["max"]
+    (100, 0.5, 1.0)
+    """
+    latencies, errors = {}, {}
+    for record in records:
+        latencies.setdefault(record["op"], []).append(record["latency"])
+        failed = "error" in record or record.get("status", 200) >= 500
+        errors[record["op"]] = errors.get(record["op"], 0) + failed
+
+    summary = {}
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        summary[op] = {"count": len(values), "errors": errors[op]}
+        for name, q in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]:
+            summary[op][name] = values[max(0, int(round(q * len(values))) - 1)]
+        summary[op]["max"] = values[-1]
+    return summary
+
+
+def _print_summary(title, summary):
+    print(title)
+    print(f"{'op':<24}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, stats in summary.items():
+        millis = [f"{stats[name] * 1000:>10.1f}" for name in ["p50", "p90", "p99", "max"]]
+        print(f"{op:<24}{stats['count']:>8}{stats['errors']:>8}{''.join(millis)}")
+
+
+def main(argv=None):
+    from .fs import V3ioFS
+
+    parser = ArgumentParser(prog="python -m v3iofs.trace", description="Replay a V3ioFS trace")
+    parser.add_argument("trace", help="trace file, recorded with V3ioFS(trace_path=...)")
+    parser.add_argument("--v3io-api", help="API to replay against (default is V3IO_API from environment)")
+    parser.add_argument("--v3io-access-key", help="access key (default is V3IO_ACCESS_KEY from environment)")
+    parser.add_argument("--concurrency", type=int, help="concurrent requests (default is the traced threads)")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale, 0 for no delays (default is 1)")
+    parser.add_argument("--writes", action="store_true", help="also replay writes")
+    args = parser.parse_args(argv)
+
+    records = read_trace(args.trace)
+    fs = V3ioFS(v3io_api=args.v3io_api, v3io_access_key=args.v3io_access_key, skip_instance_cache=True)
+    results = replay(fs, records, concurrency=args.concurrency, speed=args.speed, writes=args.writes)
+
+    if not args.writes:
+        records = [record for record in records if record["op"] not in _write_ops]
+    _print_summary("trace", summarize(records))
+    print()
+    _print_summary("replay", summarize(results))
+
+
+if __name__ == "__main__":
+    main()
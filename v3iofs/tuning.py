@@ -0,0 +1,103 @@
+# Copyright 2020 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Block sizes from measured latency and bandwidth"""
+from collections import OrderedDict, deque
+from threading import Lock
+
+# Transfers kept for latency, and per direction for bandwidth
+_window = 64
+# Transfers up to this size (info included) measure latency, larger ones bandwidth
+_small_transfer = 2**16
+# Sequential access uses blocks of this many bandwidth-delay products, so latency is a small part of each request.
+# Random access uses less, the read ahead data only adds a quarter of the latency to each read.
+_sequential_bdps = 4
+_random_bdps = 0.25
+_default_block_size = 5 * 2**20
+# Paths whose access pattern is remembered
+_max_patterns = 4096
+
+
+class _Tuner:
+    """Chooses read and write block sizes from the latency and bandwidth of recent transfers
+
+    Sequential access gets blocks of a few bandwidth-delay products, random access (as seen on the last file
+    handle that read the same path) gets a fraction of one. Until there are measurements the fsspec
+    default is used. Block sizes stay within [min_size, max_size].
+    """
+
+    def __init__(self, min_size, max_size):
+        self._min_size = min_size
+        self._max_size = max_size
+        self._lock = Lock()
+        self._latencies = deque(maxlen=_window)
+        self._transfers = {"read": deque(maxlen=_window), "write": deque(maxlen=_window)}
+        self._random = OrderedDict()
+
+    def record(self, direction, nbytes, seconds):
+        with self._lock:
+            if nbytes <= _small_transfer:
+                self._latencies.append(seconds)
+            else:
+                self._transfers[direction].append((nbytes, seconds))
+
+    def record_pattern(self, path, random):
+        with self._lock:
+            self._random[path] = random
+            self._random.move_to_end(path)
+            if len(self._random) > _max_patterns:
+                self._random.popitem(last=False)
+
+    def block_size(self, path, mode):
+        direction = "read" if mode == "rb" else "write"
+        with self._lock:
+            estimate = _estimate(self._latencies, self._transfers[direction])
+            random = direction == "read" and self._random.get(path, False)
+        if estimate is None:
+            size = _default_block_size
+        else:
+            latency, bandwidth = estimate
+            size = latency * bandwidth * (_random_bdps if random else _sequential_bdps)
+        return int(min(max(size, self._min_size), self._max_size))
+
+    def stats(self):
+        stats = {}
+        for direction, mode in [("read", "rb"), ("write", "wb")]:
+            with self._lock:
+                estimate = _estimate(self._latencies, self._transfers[direction])
+            latency, bandwidth = estimate or (None, None)
+            stats[direction] = {
+                "latency": latency,
+                "bandwidth": bandwidth,
+                "block_size": self.block_size(None, mode),
+            }
+        return stats
+
+
+def _estimate(latencies, transfers):
+    """(latency in seconds, bandwidth in bytes/second) from the latencies of small requests and the (bytes, seconds)
+    of large transfers, None if there are no large transfers
+
+    >>> latencies, transfers = [0.01, 0.012], [(2**20, 0.02), (2**22, 0.05)]  # 10ms, 100MiB/s
+    >>> latency, bandwidth = _estimate(latencies, transfers)
+    >>> latency, round(bandwidth / 2**20)
+    (0.01, 100)
+    """
+    if not transfers:
+        return None
+    # Without small requests, the quickest transfer bounds the latency
+    latency = min(latencies) if latencies else min(seconds for _, seconds in transfers) / 2
+    rates = sorted(nbytes / (seconds - latency) for nbytes, seconds in transfers if seconds > latency)
+    if not rates:
+        return None
+    return latency, rates[len(rates) // 2]
@@ -15,6 +15,13 @@
 _ignore_statuses = {200, 204, 206, 409}
 
 
+class RaiseForStatus:
+    """Same values as v3io.dataplane.RaiseForStatus, without importing the v3io client"""
+
+    never = "never"
+    always = "always"
+
+
 def handle_v3io_errors(response, file_path):
     if response.status_code in _ignore_statuses:
         return response.body